@@ -1,17 +1,24 @@
+import time
+STARTUP_BEGIN = time.perf_counter()  # vor allen anderen Imports, damit --startup-report sie mitmisst
+
 import pygame
 import random
 import sys
+import os
 import math
+import argparse
+import gc
+import json
+import queue
+import sqlite3
+import struct
+import threading
+from collections import OrderedDict, deque
+from itertools import groupby
+
+import numpy as np
 
-# Initialisierung
-pygame.init()
 WIDTH, HEIGHT = 400, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("DoodlePlumber")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont("Arial", 20, bold=True)
-big_font = pygame.font.SysFont("Arial", 32, bold=True)
-title_font = pygame.font.SysFont("Arial", 42, bold=True)
 
 # Farben - Clean und hell
 SKY_BLUE = (135, 206, 235)
@@ -34,311 +41,2069 @@ POWER_UP_PURPLE = (147, 0, 211)
 MENU = 0
 PLAYING = 1
 GAME_OVER = 2
-game_state = MENU
 
 # Spieler - jetzt größer!
 player_width = 40
 player_height = 48
-player = pygame.Rect(WIDTH // 2, HEIGHT - 60, player_width, player_height)
-player_vy = 0
 jump_strength = -15
 gravity = 0.5
 move_speed = 6
-player_facing_right = True
-player_animation_frame = 0
-
-# Spiel-Features
-coins = []
-power_ups = []
-coin_count = 0
-particle_effects = []
-
-# Wolken für Hintergrund
-clouds = []
-for i in range(8):
-    x = random.randint(-50, WIDTH + 50)
-    y = random.randint(50, HEIGHT - 100)
-    size = random.randint(40, 80)
-    speed = random.uniform(0.2, 0.8)
-    clouds.append({'x': x, 'y': y, 'size': size, 'speed': speed})
-
-# Plattformen mit Typen
+
+# Feste Simulationsrate: alle Geschwindigkeiten oben sind pro Tick gemeint
+TICK_RATE = 60
+TICK_TIME = 1.0 / TICK_RATE
+MAX_FRAME_TIME = 0.25  # Längere Hänger werden gekappt statt nachsimuliert
+
+# Eingaben für GameWorld.step() als Bitmaske
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_SPACE = 4  # Wird nur aufgezeichnet, die Simulation selbst ignoriert es
+
+# Hintergrund: Anzahl Wolken und Ebenen (Parallax-Tiefe, Drift in px pro Tick)
+CLOUD_COUNT = 8
+BACKGROUND_LAYERS = [(0.1, 0.2), (0.25, 0.5), (0.5, 0.8)]
+
+# Plattformen mit Typen - Entities haben __slots__ und werden über reset() aus einem EntityPool wiederverwendet
 class Platform:
+    __slots__ = ("rect", "prev_x", "prev_y", "type", "original_x", "move_range", "move_speed", "direction")
+    
     def __init__(self, x, y, width, height, platform_type="normal"):
         self.rect = pygame.Rect(x, y, width, height)
+        self.reset(x, y, width, height, platform_type)
+    
+    def reset(self, x, y, width, height, platform_type="normal"):
+        self.rect.update(x, y, width, height)
+        self.prev_x, self.prev_y = x, y  # Position vor dem letzten Tick (Interpolation)
         self.type = platform_type
         self.original_x = x
         self.move_range = 100  # Maximale Bewegungsreichweite
         self.move_speed = 1  # Geschwindigkeit der Bewegung
         self.direction = 1  # Richtung der Bewegung: 1 = rechts, -1 = links
     
-    def update(self, time_counter):
+    def update(self, time_counter=0):
         if self.type == "moving":
-            # Bewegung basierend auf der Richtung
-            self.rect.x += self.move_speed * self.direction
-            
-            # Wechsel der Richtung, wenn die Plattform die Grenzen erreicht
-            if self.rect.x > self.original_x + self.move_range or self.rect.x < self.original_x - self.move_range:
-                self.direction *= -1
-
-platforms = []
-score = 0
-high_score = 0
-time_counter = 0
+            self.rect.x, self.direction = self.move(self.rect.x, self.direction)
+    
+    def move(self, x, direction):
+        """Position und Richtung einen Tick später - auch für die Vorausberechnung in GameWorld.predict"""
+        # Bewegung basierend auf der Richtung
+        x += self.move_speed * direction
+        
+        # Wechsel der Richtung, wenn die Plattform die Grenzen erreicht
+        if x > self.original_x + self.move_range or x < self.original_x - self.move_range:
+            direction = -direction
+        return x, direction
 
 class Coin:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "collected", "animation")
+    
     def __init__(self, x, y):
+        self.reset(x, y)
+    
+    def reset(self, x, y):
         self.x = x
         self.y = y
+        self.prev_x, self.prev_y = x, y
         self.collected = False
         self.animation = 0
     
     def update(self):
         self.animation += 0.2
     
-    def draw(self):
-        if not self.collected:
+    def draw(self, camera_y=0, alpha=1.0):
+        x = interpolate(self.prev_x, self.x, alpha)
+        y = interpolate(self.prev_y, self.y, alpha) - camera_y
+        if not self.collected:  # Sichtbarkeit prüft draw_world() über die Kamera
             # Goldmünze mit Animation
-            size = 12 + math.sin(self.animation) * 2
-            pygame.draw.circle(screen, COIN_GOLD, (int(self.x), int(self.y)), int(size))
-            pygame.draw.circle(screen, UI_BLACK, (int(self.x), int(self.y)), int(size), 2)
+            size = 12 + math.sin(self.animation) * 2 if quality["coin_pulse"] else 12
+            dirty.mark(pygame.draw.circle(screen, COIN_GOLD, (int(x), int(y)), int(size)))
+            pygame.draw.circle(screen, UI_BLACK, (int(x), int(y)), int(size), 2)
             # "$" Symbol
-            font_small = pygame.font.SysFont("Arial", 12, bold=True)
-            coin_text = font_small.render("$", True, UI_BLACK)
-            text_rect = coin_text.get_rect(center=(self.x, self.y))
+            coin_text = render_text(small_font, "$", UI_BLACK)
+            text_rect = coin_text.get_rect(center=(x, y))
             screen.blit(coin_text, text_rect)
 
 class PowerUp:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "type", "collected", "animation")
+    
     def __init__(self, x, y, type="speed"):
+        self.reset(x, y, type)
+    
+    def reset(self, x, y, type="speed"):
         self.x = x
         self.y = y
+        self.prev_x, self.prev_y = x, y
         self.type = type
         self.collected = False
         self.animation = 0
     
     def update(self):
-        self.animation += 0.1
-        self.y += math.sin(self.animation) * 0.5
+        self.y, self.animation = self.drift(self.y, self.animation)
+    
+    @staticmethod
+    def drift(y, animation):
+        """Schwebe-Bewegung eines Ticks"""
+        animation += 0.1
+        return y + math.sin(animation) * 0.5, animation
     
-    def draw(self):
-        if not self.collected:
+    def draw(self, camera_y=0, alpha=1.0):
+        x = interpolate(self.prev_x, self.x, alpha)
+        y = interpolate(self.prev_y, self.y, alpha) - camera_y
+        if not self.collected:  # Sichtbarkeit prüft draw_world() über die Kamera
             # Power-Up Box
             size = 16
-            box_rect = pygame.Rect(self.x - size//2, self.y - size//2, size, size)
+            box_rect = pygame.Rect(x - size//2, y - size//2, size, size)
             pygame.draw.rect(screen, POWER_UP_PURPLE, box_rect)
-            pygame.draw.rect(screen, UI_BLACK, box_rect, 2)
+            dirty.mark(pygame.draw.rect(screen, UI_BLACK, box_rect, 2))
             # "!" Symbol
-            font_small = pygame.font.SysFont("Arial", 12, bold=True)
-            text = font_small.render("!", True, UI_WHITE)
-            text_rect = text.get_rect(center=(self.x, self.y))
+            text = render_text(small_font, "!", UI_WHITE)
+            text_rect = text.get_rect(center=(x, y))
             screen.blit(text, text_rect)
 
-class Particle:
-    def __init__(self, x, y, color, velocity):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.vx, self.vy = velocity
-        self.life = 30
-        self.max_life = 30
+# Partikel: feste Kapazität, Lebensdauer in Ticks, Schwerkraft pro Tick
+PARTICLE_CAPACITY = 50000
+PARTICLE_LIFE = 30
+PARTICLE_GRAVITY = 0.1
+
+def _circle_offsets(radius):
+    """Pixel-Offsets eines gefüllten Kreises als zwei Arrays"""
+    span = np.arange(-radius, radius + 1)
+    dx, dy = np.meshgrid(span, span, indexing="ij")
+    inside = dx * dx + dy * dy <= radius * radius
+    return dx[inside], dy[inside]
+
+PARTICLE_STAMPS = {radius: _circle_offsets(radius) for radius in range(1, 5)}
+
+class ParticleSystem:
+    """Partikel als Structure-of-Arrays in NumPy.
     
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += 0.1
-        self.life -= 1
-    
-    def draw(self):
-        if self.life > 0:
-            size = max(1, int(4 * (self.life / self.max_life)))
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), size)
-
-def create_jump_particles(x, y):
-    for _ in range(6):
-        velocity = (random.uniform(-2, 2), random.uniform(-2, 0))
-        color = random.choice([PLATFORM_GREEN, UI_WHITE, SKY_BLUE])
-        particle_effects.append(Particle(x, y, color, velocity))
-
-def create_coin_particles(x, y):
-    for _ in range(8):
-        velocity = (random.uniform(-3, 3), random.uniform(-3, -1))
-        particle_effects.append(Particle(x, y, COIN_GOLD, velocity))
-
-def draw_cloud(x, y, size):
-    """Zeichne eine einfache, cleane Wolke"""
-    pygame.draw.circle(screen, CLOUD_WHITE, (int(x), int(y)), int(size * 0.6))
-    pygame.draw.circle(screen, CLOUD_WHITE, (int(x - size * 0.4), int(y)), int(size * 0.4))
-    pygame.draw.circle(screen, CLOUD_WHITE, (int(x + size * 0.4), int(y)), int(size * 0.4))
-    pygame.draw.circle(screen, CLOUD_WHITE, (int(x - size * 0.2), int(y - size * 0.3)), int(size * 0.35))
-    pygame.draw.circle(screen, CLOUD_WHITE, (int(x + size * 0.2), int(y - size * 0.3)), int(size * 0.35))
+    Lebende Partikel liegen dicht gepackt in den ersten `count` Einträgen.
+    update() rechnet alle auf einmal und schiebt tote Partikel per Maske
+    heraus, draw() stempelt sie direkt in die Pixel der Surface. Ist die
+    Kapazität erreicht, werden neue Partikel verworfen. limit senkt die
+    Obergrenze ohne neu zu allozieren (Qualitätsstufen).
+    """
+    def __init__(self, capacity=PARTICLE_CAPACITY):
+        self.capacity = capacity
+        self.limit = capacity
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.dropped = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def clear(self):
+        self.count = 0
+    
+    def snapshot(self):
+        """Kopie der lebenden Partikel: (x, y, vx, vy, life, color, dropped)"""
+        n = self.count
+        return (self.x[:n].copy(), self.y[:n].copy(), self.vx[:n].copy(), self.vy[:n].copy(),
+                self.life[:n].copy(), self.color[:n].copy(), self.dropped)
+    
+    def restore(self, snapshot):
+        *arrays, self.dropped = snapshot
+        n = len(arrays[0])
+        for target, source in zip((self.x, self.y, self.vx, self.vy, self.life, self.color), arrays):
+            target[:n] = source
+        self.count = n
+    
+    def emit(self, x, y, vx, vy, colors):
+        """Neue Partikel an (x, y) mit den Geschwindigkeiten vx/vy und Farben colors"""
+        n = min(len(vx), min(self.limit, self.capacity) - self.count)
+        self.dropped += len(vx) - n
+        if n <= 0:
+            return
+        
+        start, end = self.count, self.count + n
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = vx[:n]
+        self.vy[start:end] = vy[:n]
+        self.life[start:end] = PARTICLE_LIFE
+        self.color[start:end] = colors[:n]
+        self.count = end
+    
+    def update(self, ticks=1):
+        """Partikel um `ticks` Ticks weiterbewegen - bitgenau wie `ticks` einzelne Aufrufe.
+        
+        Alle Partikel verlieren pro Tick gleich viel Leben, wer die Ticks nicht
+        überlebt, fällt deshalb vorher heraus. Die übrigen laufen Tick für Tick
+        mit derselben Arithmetik wie ein einzelner Schritt (keine geschlossene
+        Form, die anders runden würde).
+        """
+        n = self.count
+        if not n:
+            return
+        
+        # Tote Partikel entfernen, lebende nach vorne packen
+        alive = self.life[:n] > ticks
+        keep = int(np.count_nonzero(alive))
+        if keep != n:
+            for array in (self.x, self.y, self.vx, self.vy, self.life, self.color):
+                array[:keep] = array[:n][alive]
+            self.count = n = keep
+        
+        x, y, vx, vy = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n]
+        for _ in range(ticks):
+            x += vx
+            y += vy
+            vy += PARTICLE_GRAVITY
+        self.life[:n] -= ticks
+    
+    def draw(self, camera_y=0):
+        n = self.count
+        if not n:
+            return
+        
+        xs = self.x[:n].astype(np.int32)
+        ys = (self.y[:n] - camera_y).astype(np.int32)
+        sizes = np.maximum(1, 4 * self.life[:n] // PARTICLE_LIFE)
+        width, height = screen.get_size()
+        
+        # Farben einmal ins Pixelformat der Surface umrechnen
+        rgb = self.color[:n].astype(np.uint32)
+        r_shift, g_shift, b_shift, _ = screen.get_shifts()
+        mapped = (rgb[:, 0] << r_shift) | (rgb[:, 1] << g_shift) | (rgb[:, 2] << b_shift)
+        
+        # Pro Radius ein vektorisierter Stempel statt einem draw.circle pro Partikel
+        pixels = pygame.surfarray.pixels2d(screen)
+        rows = pixels.T  # (Höhe, Breite) - bei lückenlosen Zeilen als flaches Array ansprechbar
+        flat = rows.reshape(-1) if rows.flags.c_contiguous else None
+        for radius, (dx, dy) in PARTICLE_STAMPS.items():
+            selected = sizes == radius
+            if not selected.any():
+                continue
+            px = (xs[selected, None] + dx).ravel()
+            py = (ys[selected, None] + dy).ravel()
+            colors = np.repeat(mapped[selected], len(dx))
+            visible = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+            if flat is not None:
+                flat[py[visible] * width + px[visible]] = colors[visible]
+            else:
+                pixels[px[visible], py[visible]] = colors[visible]
+        del pixels, rows, flat
+        
+        dirty.mark(pygame.Rect(int(xs.min()) - 4, int(ys.min()) - 4,
+                               int(xs.max() - xs.min()) + 9, int(ys.max() - ys.min()) + 9))
 
-def draw_background():
-    """Zeichne cleanen Himmel mit Wolken"""
-    screen.fill(SKY_BLUE)
+def interpolate(previous, current, alpha):
+    """Position zwischen zwei Ticks für das Rendern"""
+    return previous + (current - previous) * alpha
+
+# Höhe eines Buckets im räumlichen Index (Weltpixel)
+SPATIAL_BUCKET_SIZE = 64
+
+class SpatialIndex:
+    """Objekte in vertikalen Buckets nach ihrer Welt-y-Position.
+    
+    Abfragen für einen y-Bereich liefern nur die Objekte aus den
+    überlappenden Buckets. `margin` deckt die Ausdehnung der Objekte um
+    ihren Ankerpunkt ab, damit keine Kandidaten verloren gehen.
+    """
+    def __init__(self, margin=0, bucket_size=SPATIAL_BUCKET_SIZE):
+        self.margin = margin
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        self.keys = {}
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def clear(self):
+        self.buckets.clear()
+        self.keys.clear()
+    
+    def insert(self, entity, y):
+        key = int(y) // self.bucket_size
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = []
+        bucket.append(entity)
+        self.keys[entity] = key
+    
+    def remove(self, entity):
+        key = self.keys.pop(entity)
+        bucket = self.buckets[key]
+        bucket.remove(entity)
+        if not bucket:
+            del self.buckets[key]
+    
+    def query(self, top, bottom, out=None):
+        """Alle Kandidaten, deren Anker zwischen top und bottom (plus margin) liegen könnte.
+        Mit out wird diese Liste geleert und wiederverwendet statt eine neue anzulegen."""
+        first = (int(top) - self.margin) // self.bucket_size
+        last = (int(bottom) + self.margin) // self.bucket_size
+        if out is None:
+            found = []
+        else:
+            found = out
+            found.clear()
+        for key in range(first, last + 1):
+            bucket = self.buckets.get(key)
+            if bucket:
+                found.extend(bucket)
+        return found
+
+class Camera:
+    """Sichtfenster über der Welt.
+    
+    Alle Objekte liegen in Weltkoordinaten (y wächst nach unten, nach oben
+    wird es negativ). Scrollen ändert nur camera.y - umgerechnet wird erst
+    beim Zeichnen, egal wie viele Objekte geladen sind.
+    """
+    def __init__(self, width=WIDTH, height=HEIGHT):
+        self.width = width
+        self.height = height
+        self.y = 0
+        self.prev_y = 0
+    
+    def reset(self):
+        self.y = 0
+        self.prev_y = 0
+    
+    def follow(self, target_y):
+        """Kamera nach oben ziehen, sobald das Ziel über die Bildschirmmitte steigt.
+        Liefert die Verschiebung in Pixeln (0, wenn die Kamera stehen bleibt)."""
+        top = target_y - self.height // 2
+        if top < self.y:
+            offset = self.y - top
+            self.y = top
+            return offset
+        return 0
+    
+    @property
+    def bottom(self):
+        return self.y + self.height
+    
+    def render_y(self, alpha=1.0):
+        """Interpolierte Oberkante für das Zeichnen"""
+        return interpolate(self.prev_y, self.y, alpha)
+    
+    def is_visible(self, top, bottom, margin=0, alpha=1.0):
+        """Liegt der Bereich top..bottom im (interpolierten) Sichtfenster?"""
+        view_top = self.render_y(alpha)
+        return bottom > view_top - margin and top < view_top + self.height + margin
+
+# Profiler: Anzahl Frames im Ringpuffer und Budget für einen Frame bei 60 FPS
+PROFILER_FRAMES = 240
+FRAME_BUDGET_MS = 1000.0 / 60
+
+class Profiler:
+    """Benannte Phasen-Timer für die Game Loop.
+    
+    Jede Phase endet mit lap(name): die Zeit seit dem vorigen lap() wird ihr
+    zugeschrieben. Pro Frame landet die Liste (Name, Start, Dauer) in einem
+    Ringpuffer. Ausgeschaltet kostet lap() nur einen Attribut-Check.
+    """
+    def __init__(self, capacity=PROFILER_FRAMES):
+        self.enabled = False
+        self.frames = deque(maxlen=capacity)
+        self.current = []
+        self.last = 0.0
+        self.origin = time.perf_counter()
+    
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.current = []
+        self.last = time.perf_counter()
+    
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current.append((name, self.last, now - self.last))
+        self.last = now
+    
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.frames.append(self.current)
+        self.current = []
+    
+    def phase_averages(self, frames=60):
+        """Durchschnittliche Millisekunden pro Frame je Phase, in der Reihenfolge des Auftretens"""
+        recent = list(self.frames)[-frames:]
+        totals = {}
+        for frame in recent:
+            for name, _, duration in frame:
+                totals[name] = totals.get(name, 0.0) + duration
+        count = max(1, len(recent))
+        return {name: total * 1000.0 / count for name, total in totals.items()}
+    
+    def export_chrome_trace(self, path):
+        """Ringpuffer als Chrome-Trace-Event-JSON schreiben (chrome://tracing, Perfetto)"""
+        events = []
+        for index, frame in enumerate(self.frames):
+            if not frame:
+                continue
+            start = frame[0][1]
+            end = frame[-1][1] + frame[-1][2]
+            events.append({"name": "frame", "cat": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6,
+                           "args": {"index": index}})
+            for name, phase_start, duration in frame:
+                events.append({"name": name, "cat": "phase", "ph": "X", "pid": 1, "tid": 1,
+                               "ts": (phase_start - self.origin) * 1e6, "dur": duration * 1e6})
+        ensure_parent_dir(path)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+profiler = Profiler()
+
+class EntityPool:
+    """Free-List für Entities einer Klasse.
+    
+    release() legt ein entferntes Objekt zurück, acquire() setzt es per
+    reset() neu auf. Gebaut wird nur, wenn die Liste leer ist - im
+    eingeschwungenen Spiel bleibt allocated konstant.
+    """
+    def __init__(self, factory):
+        self.factory = factory
+        self.free = []
+        self.allocated = 0
+        self.recycled = 0
+    
+    def acquire(self, *args):
+        if self.free:
+            entity = self.free.pop()
+            entity.reset(*args)
+            self.recycled += 1
+            return entity
+        self.allocated += 1
+        return self.factory(*args)
+    
+    def release(self, entity):
+        self.free.append(entity)
+    
+    def release_all(self, entities):
+        self.free.extend(entities)
+        entities.clear()
+
+class AllocationMeter:
+    """Neu gebaute Entities und Netto-Zuwachs GC-verfolgter Objekte pro Frame.
+    
+    gc.get_count()[0] zählt Allokationen minus Freigaben seit der letzten
+    Sammlung, steigt also nur, wenn Objekte liegen bleiben.
+    """
+    def __init__(self):
+        self.collections = 0
+        self.last_entities = 0
+        self.last_gc_count = gc.get_count()[0]
+        self.last_collections = 0
+        self.entities = 0
+        self.gc_objects = 0
+        self.frames = 0
+        self.allocating_frames = 0
+        gc.callbacks.append(self.on_gc)
+    
+    def on_gc(self, phase, info):
+        if phase == "start":
+            self.collections += 1
+    
+    def sample(self, world):
+        entities = world.entity_allocations() if world is not None else self.last_entities
+        count = gc.get_count()[0]
+        self.entities = entities - self.last_entities
+        # Nach einer Sammlung beginnt der Zähler wieder bei 0
+        self.gc_objects = count - self.last_gc_count if self.collections == self.last_collections else count
+        self.last_entities = entities
+        self.last_gc_count = count
+        self.last_collections = self.collections
+        self.frames += 1
+        if self.entities:
+            self.allocating_frames += 1
+    
+    def close(self):
+        gc.callbacks.remove(self.on_gc)
+
+def random_platform_type(rng):
+    """Bestimme Plattform-Typ"""
+    rand = rng.randint(1, 10)
+    if rand <= 2:  # 20% Chance für Sprungfeder
+        return "bounce"
+    elif rand <= 3:  # 10% Chance für bewegliche Plattform
+        return "moving"
+    else:  # 70% normale Plattformen
+        return "normal"
+
+# Levelgenerierung in Chunks: je CHUNK_PLATFORMS Plattformen, pro Chunk ein eigener Seed
+CHUNK_PLATFORMS = 6
+CHUNK_ATTEMPTS = 20  # Versuche pro Plattform, bevor eine sicher erreichbare gesetzt wird
+LEVEL_LOOKAHEAD = HEIGHT // 2  # so weit über der Kamera müssen Plattformen stehen
+PREFETCH_CHUNKS = 2  # so viele Chunks generiert der Hintergrund-Thread voraus
+LEVEL_CACHE_SIZE = 512
+JUMP_MARGIN = 10  # Sicherheitsabstand für Rundung der Rect-Positionen
+START_PLATFORM = (WIDTH // 2 - 60, HEIGHT - 60, 120, "normal")  # (x, y, Breite, Typ), Chunk 0 baut darauf auf
+SEED_RANGE = 2 ** 64  # Seeds werden auf u64 abgebildet, siehe GameWorld.reset
+
+def jump_height(velocity=jump_strength):
+    """Maximale Sprunghöhe in Pixeln für die Tick-Physik (vy += gravity, dann y += vy)"""
+    ticks = math.ceil(-velocity / gravity)
+    return -(velocity * ticks + gravity * ticks * (ticks + 1) / 2)
+
+def jump_reach(rise, velocity=jump_strength):
+    """Größte horizontale Strecke, die bei einem Sprung auf eine um `rise` Pixel höhere
+    Plattform möglich ist, oder -1 wenn sie zu hoch liegt.
+    
+    Nach t Ticks ist der Spieler h(t) = -(v*t + g*t*(t+1)/2) hoch. Landen kann er im
+    letzten Tick mit h(t) >= rise, also an der größeren Nullstelle der Parabel.
+    """
+    rise += JUMP_MARGIN
+    if rise > jump_height(velocity):
+        return -1
+    b = velocity + gravity / 2
+    ticks = math.floor((-b + math.sqrt(b * b - 2 * gravity * rise)) / gravity)
+    return ticks * move_speed
+
+def platform_gap(lower, upper):
+    """Horizontaler Abstand zwischen zwei Plattformen, den der Spieler überwinden muss.
+    Berücksichtigt das Umbrechen am Bildschirmrand und die Reichweite beweglicher Plattformen."""
+    lower_x, _, lower_width, lower_type = lower
+    upper_x, _, upper_width, upper_type = upper
+    # Spieler-x, bei denen sich Spieler und Plattform überlappen
+    lower_lo, lower_hi = lower_x - player_width + 1, lower_x + lower_width - 1
+    upper_lo, upper_hi = upper_x - player_width + 1, upper_x + upper_width - 1
+    period = WIDTH + player_width  # nach so vielen Pixeln ist man einmal herum
+    if upper_lo > lower_hi:
+        gap = min(upper_lo - lower_hi, period - (upper_hi - lower_lo))
+    elif lower_lo > upper_hi:
+        gap = min(lower_lo - upper_hi, period - (lower_hi - upper_lo))
+    else:
+        gap = 0
+    gap = max(0, gap)
+    for platform_type in (lower_type, upper_type):
+        if platform_type == "moving":
+            gap += 100 + 1  # Platform.move_range, ungünstigste Phase
+    return gap
+
+def is_reachable(lower, upper):
+    """Kann der Spieler mit einem normalen Sprung von lower auf upper landen?
+    Plattformen als (x, y, Breite, Typ)."""
+    return platform_gap(lower, upper) <= jump_reach(lower[1] - upper[1])
+
+def generate_chunk(seed, index, previous):
+    """Plattformen eines Chunks als (x, y, Breite, Typ), jede von der vorigen aus erreichbar.
+    Der Zufall hängt nur von (seed, index) und der letzten Plattform davor ab."""
+    rng = random.Random(f"{seed}:{index}")
+    platforms = []
+    for _ in range(CHUNK_PLATFORMS):
+        for _ in range(CHUNK_ATTEMPTS):
+            x = rng.randint(0, WIDTH - 120)
+            y = previous[1] - rng.randint(60, 100)
+            candidate = (x, y, rng.randint(80, 120), random_platform_type(rng))
+            if is_reachable(previous, candidate):
+                break
+        else:
+            # Notlösung: normale Plattform direkt über der vorigen
+            candidate = (min(previous[0], WIDTH - 120), previous[1] - 60, 120, "normal")
+        platforms.append(candidate)
+        previous = candidate
+    return tuple(platforms)
+
+# Fertige Chunks, Schlüssel (seed, index), gemeinsam für alle Welten und Threads
+level_cache = OrderedDict()
+level_lock = threading.RLock()
+
+class LevelGenerator:
+    """Liefert die Chunks eines Levels und generiert sie auf Wunsch im Hintergrund voraus.
+    
+    Chunk i hängt von der letzten Plattform von Chunk i-1 ab; das Ergebnis ist
+    trotzdem nur vom Seed bestimmt, egal welcher Thread es erzeugt.
+    """
+    def __init__(self, seed, start, prefetch=False):
+        self.seed = seed
+        self.start = start
+        self.target = -1
+        self.closed = False
+        self.wakeup = threading.Condition(level_lock)
+        self.thread = None
+        if prefetch:
+            self.thread = threading.Thread(target=self.run, name="level-prefetch", daemon=True)
+            self.thread.start()
+    
+    def cached(self, index):
+        chunk = level_cache.get((self.seed, index))
+        if chunk is not None:
+            level_cache.move_to_end((self.seed, index))
+        return chunk
     
-    for cloud in clouds:
-        draw_cloud(cloud['x'], cloud['y'], cloud['size'])
-        cloud['x'] += cloud['speed']
+    def chunk(self, index):
+        """Chunk holen - aus dem Cache oder jetzt sofort generieren"""
+        with level_lock:
+            chunk = self.cached(index)
+            if chunk is not None:
+                return chunk
+            # Rückwärts bis zum letzten bekannten Chunk, dann vorwärts generieren
+            first = index
+            while first > 0 and self.cached(first - 1) is None:
+                first -= 1
+            for i in range(first, index + 1):
+                previous = self.cached(i - 1)[-1] if i > 0 else self.start
+                chunk = generate_chunk(self.seed, i, previous)
+                level_cache[(self.seed, i)] = chunk
+                if len(level_cache) > LEVEL_CACHE_SIZE:
+                    level_cache.popitem(last=False)
+            return chunk
+    
+    def prefetch(self, index):
+        """Hintergrund-Thread bis einschließlich Chunk index vorarbeiten lassen"""
+        if self.thread is None or index <= self.target:
+            return
+        with self.wakeup:
+            self.target = index
+            self.wakeup.notify()
+    
+    def run(self):
+        index = 0
+        with self.wakeup:
+            while not self.closed:
+                if index > self.target:
+                    self.wakeup.wait()
+                    continue
+                self.chunk(index)
+                index += 1
+                # Lock zwischen zwei Chunks kurz freigeben
+                self.wakeup.wait(0)
+    
+    def close(self):
+        if self.thread is None:
+            return
+        with self.wakeup:
+            self.closed = True
+            self.wakeup.notify()
+        self.thread.join()
+        self.thread = None
+
+def lands_on(player_x, prev_bottom, bottom, platform_x, rect):
+    """Swept-Test für eine Landung: die Unterkante des Spielers läuft in diesem Tick als Strecke
+    von prev_bottom nach bottom. Sie landet, wenn die Strecke die Plattform zwischen Ober- und
+    Unterkante trifft und Spieler und Plattform (an ihrer x-Position in diesem Tick) sich
+    horizontal überlappen - egal wie schnell der Spieler fällt."""
+    return (prev_bottom <= rect.bottom and bottom > rect.top
+            and player_x < platform_x + rect.width and player_x + player_width > platform_x)
+
+class GameWorld:
+    """Komplette Spiel-Simulation ohne Fenster.
+    
+    Hält Spieler, Plattformen, Collectibles und Partikel und rückt sie mit
+    step(inputs) um einen Frame weiter. Braucht weder Display noch
+    pygame.init(), dadurch lassen sich Bots, Tests und Benchmarks headless
+    mit tausenden Frames pro Sekunde fahren. step(inputs, ticks) rechnet
+    mehrere Ticks am Stück und kommt dabei zum selben Ergebnis wie einzelne
+    Ticks mit denselben Eingaben. snapshot() und restore() sichern und
+    setzen den kompletten Stand samt RNG, etwa für suchende Bots.
+    
+    Jeder Zufall läuft über self.rng, das bei reset(seed) neu gesetzt wird -
+    gleicher Seed und gleiche Eingaben ergeben exakt denselben Lauf. Die
+    Plattformen kommen chunkweise aus einem LevelGenerator, mit prefetch=True
+    generiert ihn ein Hintergrund-Thread voraus.
+    """
+    def __init__(self, seed=None, prefetch=False):
+        self.player = pygame.Rect(WIDTH // 2, HEIGHT - 60, player_width, player_height)
+        self.player_prev = self.player.topleft
+        self.player_vy = 0
+        self.move_speed = move_speed
+        self.player_facing_right = True
+        self.platforms = []
+        self.coins = []
+        self.power_ups = []
+        # Räumliche Indizes, Anker: Plattform-Oberkante bzw. Mittelpunkt
+        self.platform_index = SpatialIndex(margin=20)
+        self.coin_index = SpatialIndex(margin=15)
+        self.power_up_index = SpatialIndex(margin=32)
+        self.platform_pool = EntityPool(Platform)
+        self.coin_pool = EntityPool(Coin)
+        self.power_up_pool = EntityPool(PowerUp)
+        self.candidates = []  # wiederverwendete Liste für Index-Abfragen
+        self.hit_rect = pygame.Rect(0, 0, 0, 0)  # Kollisions-Rechteck für Münzen und Power-Ups
+        self.probe = pygame.Rect(0, 0, player_width, player_height)  # Spieler in der Vorausberechnung
+        self.path = []  # vorausberechnete Flugbahn: (x, y, vy, Unterkante davor) pro Tick
+        self.highest_platform_y = 0
+        self.prefetch = prefetch
+        self.level = None
+        self.next_chunk = 0
+        self.particles = ParticleSystem()
+        self.camera = Camera()
+        self.score = 0
+        self.high_score = 0
+        self.coin_count = 0
+        self.time_counter = 0
+        self.scroll_offset = 0  # Kamera-Verschiebung im letzten Frame
+        self.game_over = False
+        self.seed = None
+        self.rng = random.Random()
+        self.reset(seed)
+    
+    def reset(self, seed=None):
+        """Spiel zurücksetzen - ohne Seed wird ein neuer gewürfelt"""
+        if seed is None:
+            seed = random.getrandbits(64)
+        # Replay und Snapshot speichern den Seed als u64 - jeder spielbare Seed muss hineinpassen
+        seed %= SEED_RANGE
+        self.seed = seed
+        self.rng.seed(seed)
+        
+        player = self.player
+        player.x = WIDTH // 2 - player_width // 2
+        self.player_vy = 0
+        self.score = 0
+        self.coin_count = 0
+        self.time_counter = 0
+        self.scroll_offset = 0
+        self.game_over = False
+        
+        self.platform_pool.release_all(self.platforms)
+        self.coin_pool.release_all(self.coins)
+        self.power_up_pool.release_all(self.power_ups)
+        self.platform_index.clear()
+        self.coin_index.clear()
+        self.power_up_index.clear()
+        self.highest_platform_y = HEIGHT
+        self.particles.clear()
+        self.camera.reset()
+        
+        # Startplattform (normal)
+        start = START_PLATFORM
+        start_platform = self.platform_pool.acquire(start[0], start[1], start[2], 20, start[3])
+        self.add_platform(start_platform)
+        
+        player.y = start_platform.rect.y - player.height
+        self.player_prev = player.topleft
+        
+        # Weitere Plattformen kommen aus den Level-Chunks
+        if self.level is not None:
+            self.level.close()
+        self.level = LevelGenerator(seed, start, self.prefetch)
+        self.next_chunk = 0
+        self.load_chunks()
+    
+    def add_platform(self, platform):
+        self.platforms.append(platform)
+        self.platform_index.insert(platform, platform.rect.y)
+        self.highest_platform_y = min(self.highest_platform_y, platform.rect.y)
+    
+    def add_coin(self, coin):
+        self.coins.append(coin)
+        self.coin_index.insert(coin, coin.y)
+    
+    def add_power_up(self, power_up):
+        self.power_ups.append(power_up)
+        self.power_up_index.insert(power_up, power_up.y)
+    
+    def load_chunks(self):
+        """Chunks laden, bis über der Kamera genug Plattformen stehen"""
+        while self.highest_platform_y > self.camera.y - LEVEL_LOOKAHEAD:
+            for x, y, width, platform_type in self.level.chunk(self.next_chunk):
+                self.add_platform(self.platform_pool.acquire(x, y, width, 20, platform_type))
+            self.next_chunk += 1
+        self.level.prefetch(self.next_chunk + PREFETCH_CHUNKS - 1)
+    
+    def create_jump_particles(self, x, y, count=6):
+        rng = self.rng
+        vx = np.array([rng.uniform(-2, 2) for _ in range(count)])
+        vy = np.array([rng.uniform(-2, 0) for _ in range(count)])
+        colors = [rng.choice([PLATFORM_GREEN, UI_WHITE, SKY_BLUE]) for _ in range(count)]
+        self.particles.emit(x, y, vx, vy, np.array(colors, dtype=np.uint8))
+    
+    def create_coin_particles(self, x, y, count=8):
+        rng = self.rng
+        vx = np.array([rng.uniform(-3, 3) for _ in range(count)])
+        vy = np.array([rng.uniform(-3, -1) for _ in range(count)])
+        self.particles.emit(x, y, vx, vy, np.full((count, 3), COIN_GOLD, dtype=np.uint8))
+    
+    def spawn_collectibles(self):
+        """Spawne Münzen und Power-Ups auf Plattformen"""
+        for platform in self.platforms:
+            # Überprüfe, ob bereits Münzen in der Nähe sind
+            nearby = self.coin_index.query(platform.rect.y - 50, platform.rect.y + 50, self.candidates)
+            has_nearby_coin = any(abs(coin.x - platform.rect.centerx) < 50 and abs(coin.y - platform.rect.y) < 50 for coin in nearby)
+            
+            # Spawne Münzen mit einer höheren Wahrscheinlichkeit
+            if not has_nearby_coin and self.rng.randint(1, 100) <= 5:  # 5% Chance für Münze
+                coin_x = self.rng.randint(platform.rect.x + 10, platform.rect.right - 10)
+                coin_y = platform.rect.y - 20
+                self.add_coin(self.coin_pool.acquire(coin_x, coin_y))
+    
+    @staticmethod
+    def despawn(entities, index, pool, keep):
+        """Objekte an Ort und Stelle aussortieren, aus dem Index nehmen und in den Pool legen"""
+        kept = 0
+        for entity in entities:
+            if keep(entity):
+                entities[kept] = entity
+                kept += 1
+            else:
+                index.remove(entity)
+                pool.release(entity)
+        del entities[kept:]
+    
+    def despawn_below(self):
+        """Alles entfernen, was zu weit unter der Kamera liegt"""
+        bottom = self.camera.bottom
+        self.despawn(self.platforms, self.platform_index, self.platform_pool, lambda p: p.rect.y < bottom + 50)
+        self.despawn(self.coins, self.coin_index, self.coin_pool, lambda c: c.y < bottom + 100)
+        self.despawn(self.power_ups, self.power_up_index, self.power_up_pool, lambda p: p.y < bottom + 100)
+    
+    def snapshot(self):
+        """Kompletten Stand als WorldSnapshot kopieren - mit restore() geht es bitgenau weiter"""
+        player = self.player
+        camera = self.camera
+        power_up_keys = self.power_up_index.keys
+        return WorldSnapshot(
+            (self.seed, player.x, player.y, self.player_prev[0], self.player_prev[1], self.player_vy,
+             self.move_speed, self.player_facing_right, camera.y, camera.prev_y, self.score, self.high_score,
+             self.coin_count, self.time_counter, self.scroll_offset, self.game_over,
+             self.highest_platform_y, self.next_chunk),
+            [(p.rect.x, p.rect.y, p.rect.width, p.rect.height, p.type, p.original_x, p.direction, p.prev_x, p.prev_y)
+             for p in self.platforms],
+            [(c.x, c.y, c.prev_x, c.prev_y, c.animation) for c in self.coins],
+            # Power-Ups schweben seit dem Einfügen, ihr Bucket im Index wird mitgenommen
+            [(p.x, p.y, p.prev_x, p.prev_y, p.type, p.animation, power_up_keys[p]) for p in self.power_ups],
+            self.particles.snapshot(),
+            self.rng.getstate())
+    
+    def restore(self, snapshot):
+        """Stand aus snapshot() übernehmen, auch in eine andere GameWorld.
+        Entities kommen aus den Pools, die Indizes werden in derselben Reihenfolge neu aufgebaut."""
+        (seed, player_x, player_y, prev_x, prev_y, self.player_vy, self.move_speed, self.player_facing_right,
+         camera_y, camera_prev_y, self.score, self.high_score, self.coin_count, self.time_counter,
+         self.scroll_offset, self.game_over, self.highest_platform_y, self.next_chunk) = snapshot.world
+        self.player.topleft = (player_x, player_y)
+        self.player_prev = (prev_x, prev_y)
+        self.camera.y = camera_y
+        self.camera.prev_y = camera_prev_y
+        self.rng.setstate(snapshot.rng)
+        
+        # Chunks hängen nur vom Seed ab, der Generator muss nur bei einem anderen Seed neu
+        if seed != self.seed or self.level is None:
+            if self.level is not None:
+                self.level.close()
+            self.level = LevelGenerator(seed, START_PLATFORM, self.prefetch)
+        self.seed = seed
+        
+        self.platform_pool.release_all(self.platforms)
+        self.coin_pool.release_all(self.coins)
+        self.power_up_pool.release_all(self.power_ups)
+        self.platform_index.clear()
+        self.coin_index.clear()
+        self.power_up_index.clear()
+        for x, y, width, height, platform_type, original_x, direction, prev_x, prev_y in snapshot.platforms:
+            platform = self.platform_pool.acquire(x, y, width, height, platform_type)
+            platform.original_x, platform.direction = original_x, direction
+            platform.prev_x, platform.prev_y = prev_x, prev_y
+            self.platforms.append(platform)
+            self.platform_index.insert(platform, y)
+        for x, y, prev_x, prev_y, animation in snapshot.coins:
+            coin = self.coin_pool.acquire(x, y)
+            coin.prev_x, coin.prev_y, coin.animation = prev_x, prev_y, animation
+            self.add_coin(coin)
+        for x, y, prev_x, prev_y, power_up_type, animation, key in snapshot.power_ups:
+            power_up = self.power_up_pool.acquire(x, y, power_up_type)
+            power_up.prev_x, power_up.prev_y, power_up.animation = prev_x, prev_y, animation
+            self.power_ups.append(power_up)
+            self.power_up_index.insert(power_up, key * self.power_up_index.bucket_size)
+        self.particles.restore(snapshot.particles)
+    
+    def entity_allocations(self):
+        """Bisher neu gebaute Plattformen, Münzen und Power-Ups (ohne wiederverwendete)"""
+        return self.platform_pool.allocated + self.coin_pool.allocated + self.power_up_pool.allocated
+    
+    def store_previous(self):
+        """Positionen vor dem Tick merken, damit der Renderer interpolieren kann"""
+        self.player_prev = self.player.topleft
+        self.camera.prev_y = self.camera.y
+        for platform in self.platforms:
+            platform.prev_x, platform.prev_y = platform.rect.topleft
+        for coin in self.coins:
+            coin.prev_x, coin.prev_y = coin.x, coin.y
+        for power_up in self.power_ups:
+            power_up.prev_x, power_up.prev_y = power_up.x, power_up.y
+    
+    def step(self, inputs=0, ticks=1):
+        """Simuliere `ticks` Ticks (je 1/TICK_RATE s) mit gehaltenen Eingaben.
+        inputs ist eine Bitmaske aus INPUT_LEFT/INPUT_RIGHT.
+        
+        Ticks, in denen laut predict() nichts passiert, werden am Stück mit
+        fast_forward() gerechnet, jeder Tick mit Landung, Einsammeln, Spawn oder
+        Game Over einzeln mit tick(). Das Ergebnis ist dasselbe wie bei `ticks`
+        Aufrufen mit ticks=1, nur die Interpolation sieht lediglich den Stand davor.
+        """
+        if self.game_over:
+            return
+        
+        self.store_previous()
+        self.scroll_offset = 0
+        profiler.lap("store_previous")
+        
+        while ticks > 0 and not self.game_over:
+            if ticks > 1:
+                quiet = self.predict(inputs, ticks)
+                if quiet:
+                    self.fast_forward(inputs, quiet)
+                    ticks -= quiet
+                    profiler.lap("fast_forward")
+                    continue
+            self.tick(inputs)
+            ticks -= 1
+    
+    def predict(self, inputs, limit):
+        """Wie viele der nächsten Ticks (höchstens limit) ohne Ereignis ablaufen: keine Landung,
+        nichts eingesammelt, kein Spawn-Tick und kein Game Over.
+        
+        Die Flugbahn wird mit denselben Rect-Rundungen wie in tick() vorausberechnet und
+        Tick für Tick gegen Plattformen (samt ihrer Bewegung), Münzen und Power-Ups geprüft.
+        Nachgeladene Plattformen liegen LEVEL_LOOKAHEAD über der Kamera und damit weit
+        außerhalb der Sprunghöhe, sie können in diesem Zeitraum nicht getroffen werden.
+        """
+        limit = min(limit, 59 - self.time_counter % 60)  # Spawn-Tick nie überspringen
+        if limit <= 0:
+            return 0
+        
+        # Flugbahn und Kamera bis zum Game Over oder zum Limit
+        player = self.player
+        probe = self.probe
+        probe.topleft = player.topleft
+        path = self.path
+        path.clear()
+        vy = self.player_vy
+        dx = 0
+        if inputs & INPUT_LEFT:
+            dx -= self.move_speed
+        if inputs & INPUT_RIGHT:
+            dx += self.move_speed
+        camera = self.camera
+        camera_y = camera.y
+        first = limit + 1  # erster Tick mit Ereignis
+        for tick in range(1, limit + 1):
+            prev_bottom = probe.bottom
+            probe.x += dx
+            if probe.right < 0:
+                probe.left = WIDTH
+            elif probe.left > WIDTH:
+                probe.right = 0
+            vy += gravity
+            probe.y += vy
+            path.append((probe.x, probe.y, vy, prev_bottom))
+            camera_y = min(camera_y, probe.y - camera.height // 2)
+            if probe.top > camera_y + camera.height:
+                first = tick
+                break
+        
+        top = min(player.y, min(y for _, y, _, _ in path))
+        bottom = max(player.y, max(y for _, y, _, _ in path)) + player_height
+        
+        # Landungen: jede Plattform läuft mit, bewegliche Tick für Tick
+        for platform in self.platform_index.query(top, bottom, self.candidates):
+            rect = platform.rect
+            x, direction = rect.x, platform.direction
+            moving = platform.type == "moving"
+            for tick in range(1, first):
+                if moving:
+                    x, direction = platform.move(x, direction)
+                px, py, vy, prev_bottom = path[tick - 1]
+                if vy > 0 and lands_on(px, prev_bottom, py + player_height, x, rect):
+                    first = tick
+                    break
+        
+        # Münzen und Power-Ups
+        hit_rect = self.hit_rect
+        for coin in self.coin_index.query(top, bottom, self.candidates):
+            hit_rect.update(coin.x - 15, coin.y - 15, 30, 30)
+            for tick in range(1, first):
+                probe.topleft = path[tick - 1][:2]
+                if probe.colliderect(hit_rect):
+                    first = tick
+                    break
+        for power_up in self.power_up_index.query(top, bottom, self.candidates):
+            y, animation = power_up.y, power_up.animation
+            for tick in range(1, first):
+                hit_rect.update(power_up.x - 16, y - 16, 32, 32)
+                probe.topleft = path[tick - 1][:2]
+                if probe.colliderect(hit_rect):
+                    first = tick
+                    break
+                y, animation = PowerUp.drift(y, animation)
+        return first - 1
+    
+    def fast_forward(self, inputs, ticks):
+        """`ticks` Ticks ohne Ereignis am Stück rechnen - die Flugbahn kommt aus predict()"""
+        movers = [platform for platform in self.platforms if platform.type == "moving"]
+        camera = self.camera
+        for tick in range(ticks):
+            for platform in movers:
+                platform.update()
+            offset = camera.follow(self.path[tick][1])
+            if offset:
+                self.score += offset * 0.1
+                self.scroll_offset += offset
+                if self.highest_platform_y > camera.y - LEVEL_LOOKAHEAD:
+                    # Nachgeladene Plattformen bewegen sich ab dem nächsten Tick, wie in tick()
+                    loaded = len(self.platforms)
+                    self.load_chunks()
+                    movers.extend(p for p in self.platforms[loaded:] if p.type == "moving")
+        
+        x, y, self.player_vy, _ = self.path[ticks - 1]
+        self.player.topleft = (x, y)
+        if inputs & INPUT_LEFT:
+            self.player_facing_right = False
+        if inputs & INPUT_RIGHT:
+            self.player_facing_right = True
+        for coin in self.coins:
+            for _ in range(ticks):
+                coin.update()
+        for power_up in self.power_ups:
+            for _ in range(ticks):
+                power_up.update()
+        self.particles.update(ticks)
+        self.time_counter += ticks
+        
+        # Aussortieren einmal am Ende: die Kamera steigt nur, also fällt dasselbe weg wie Tick für Tick
+        if self.scroll_offset:
+            self.despawn_below()
+    
+    def tick(self, inputs):
+        """Einen einzelnen Tick komplett simulieren"""
+        prof = profiler
+        self.time_counter += 1
+        player = self.player
+        
+        # Bewegung
+        if inputs & INPUT_LEFT:
+            player.x -= self.move_speed
+            self.player_facing_right = False
+        if inputs & INPUT_RIGHT:
+            player.x += self.move_speed
+            self.player_facing_right = True
         
-        if cloud['x'] > WIDTH + cloud['size']:
-            cloud['x'] = -cloud['size']
+        # Bildschirmgrenzen (horizontal umbrechen)
+        if player.right < 0:
+            player.left = WIDTH
+        elif player.left > WIDTH:
+            player.right = 0
+        prof.lap("movement")
+        
+        # Plattformen aktualisieren (bewegliche Plattformen)
+        for platform in self.platforms:
+            platform.update(self.time_counter)
+        prof.lap("platform_update")
+        
+        # Physik
+        prev_bottom = player.bottom
+        self.player_vy += gravity
+        player.y += self.player_vy
+        
+        # Plattform-Kollision: Unterkante als Strecke, bei mehreren Treffern zählt die höchste Plattform
+        if self.player_vy > 0:
+            landing = None
+            for platform in self.platform_index.query(prev_bottom, player.bottom, self.candidates):
+                rect = platform.rect
+                if lands_on(player.x, prev_bottom, player.bottom, rect.x, rect) and (landing is None or rect.top < landing.rect.top):
+                    landing = platform
+            if landing is not None:
+                player.bottom = landing.rect.top
+                
+                if landing.type == "bounce":
+                    self.player_vy = jump_strength * 1.5  # Stärkerer Sprung
+                    self.create_jump_particles(player.centerx, player.bottom)
+                else:
+                    self.player_vy = jump_strength
+                    self.create_jump_particles(player.centerx, player.bottom)
+        prof.lap("collision")
+        
+        # Münzen sammeln - nur Kandidaten auf Höhe des Spielers prüfen
+        hit_rect = self.hit_rect
+        for coin in self.coin_index.query(player.top, player.bottom, self.candidates):
+            if not coin.collected:
+                hit_rect.update(coin.x - 15, coin.y - 15, 30, 30)
+                if player.colliderect(hit_rect):
+                    coin.collected = True
+                    self.coin_count += 1
+                    self.score += 50
+                    self.create_coin_particles(coin.x, coin.y)
+                    self.coins.remove(coin)
+                    self.coin_index.remove(coin)
+                    self.coin_pool.release(coin)
+        for coin in self.coins:
+            coin.update()
+        prof.lap("coins")
+        
+        # Power-Ups sammeln
+        for power_up in self.power_up_index.query(player.top, player.bottom, self.candidates):
+            if not power_up.collected:
+                hit_rect.update(power_up.x - 16, power_up.y - 16, 32, 32)
+                if player.colliderect(hit_rect):
+                    power_up.collected = True
+                    self.score += 100
+                    # Temporärer Geschwindigkeitsboost
+                    self.move_speed = min(8, self.move_speed + 1)
+                    self.power_ups.remove(power_up)
+                    self.power_up_index.remove(power_up)
+                    self.power_up_pool.release(power_up)
+        for power_up in self.power_ups:
+            power_up.update()
+        prof.lap("power_ups")
+        
+        # Partikel aktualisieren
+        self.particles.update()
+        prof.lap("particles")
+        
+        # Kamera-Effekt: nur die Kamera bewegt sich, die Objekte bleiben in Weltkoordinaten
+        offset = self.camera.follow(player.y)
+        if offset:
+            self.score += offset * 0.1
+            self.scroll_offset += offset
+        prof.lap("camera")
+        
+        # Neue Plattformen aus vorab generierten Chunks
+        self.load_chunks()
+        
+        # Spawne Collectibles nur gelegentlich
+        if self.time_counter % 60 == 0:  # Nur einmal pro Sekunde prüfen
+            self.spawn_collectibles()
+        prof.lap("spawning")
+        
+        # Objekte entfernen die zu weit unter der Kamera sind - das ändert sich nur beim Scrollen
+        if offset:
+            self.despawn_below()
+        
+        # Game Over
+        if player.top > self.camera.bottom:
+            if self.score > self.high_score:
+                self.high_score = self.score
+            self.game_over = True
+        prof.lap("despawn")
+
+class Replay:
+    """Aufzeichnung eines Laufs: Seed plus eine Eingabe-Bitmaske pro Tick.
+    
+    Binärformat (little endian): Kopf "DPRP", Version (u8), Seed (u64),
+    Anzahl Ticks (u32), danach lauflängenkodiert Paare aus Eingabe (u8)
+    und Wiederholungen (u16). Gehaltene Tasten kosten so 3 Bytes pro Lauf.
+    """
+    MAGIC = b"DPRP"
+    VERSION = 3  # 2: Plattformen aus Level-Chunks, 3: Swept-Kollision
+    HEADER = struct.Struct("<4sBQI")
+    RUN = struct.Struct("<BH")
+    
+    def __init__(self, seed, inputs=None):
+        self.seed = seed
+        self.inputs = bytearray(inputs or b"")
+    
+    def __len__(self):
+        return len(self.inputs)
+    
+    def record(self, inputs):
+        self.inputs.append(inputs)
+    
+    def to_bytes(self):
+        chunks = [self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, len(self.inputs))]
+        i = 0
+        while i < len(self.inputs):
+            value = self.inputs[i]
+            run = 1
+            while i + run < len(self.inputs) and self.inputs[i + run] == value and run < 0xFFFF:
+                run += 1
+            chunks.append(self.RUN.pack(value, run))
+            i += run
+        return b"".join(chunks)
+    
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, ticks = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("keine DoodlePlumber-Aufzeichnung (Version %d)" % cls.VERSION)
+        inputs = bytearray()
+        for value, run in cls.RUN.iter_unpack(data[cls.HEADER.size:]):
+            inputs.extend(bytes((value,)) * run)
+        if len(inputs) != ticks:
+            raise ValueError("Aufzeichnung unvollständig: %d von %d Ticks" % (len(inputs), ticks))
+        return cls(seed, inputs)
+    
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+def play_replay(replay, world=None):
+    """Aufzeichnung headless mit maximaler Geschwindigkeit abspielen"""
+    if world is None:
+        world = GameWorld()
+    world.reset(replay.seed)
+    # Gleiche Eingaben am Stück als ein step() über mehrere Ticks
+    for inputs, run in groupby(replay.inputs):
+        world.step(inputs, ticks=len(list(run)))
+        if world.game_over:
+            break
+    return world
 
-def draw_enhanced_mario():
-    """Zeichne größeren, detaillierten Mario-Charakter"""
-    x, y = player.x, player.y
+class WorldSnapshot:
+    """Stand einer GameWorld aus GameWorld.snapshot(), im Speicher nur Tupel und Arrays.
+    
+    Binärformat (little endian): Kopf "DPWS", Version (u8), danach die
+    Welt-Werte, der Zustand des Mersenne-Twisters (625 x u32 plus gauss_next),
+    die Anzahlen und je ein fester Datensatz pro Plattform, Münze und
+    Power-Up. Die Partikel folgen als rohe Arrays.
+    """
+    MAGIC = b"DPWS"
+    VERSION = 2
+    HEADER = struct.Struct("<4sB")
+    # seed, Spieler x/y, vorher x/y, vy, move_speed, Blickrichtung, Kamera y/vorher, score, high_score,
+    # Münzen, Ticks, Scroll, Game Over, höchste Plattform, nächster Chunk, dann die vier Anzahlen
+    WORLD = struct.Struct("<QiiiidiBiiddIIiBiIHHHI")
+    RNG = struct.Struct("<i625IBd")
+    PLATFORM = struct.Struct("<iiiiBibii")
+    COIN = struct.Struct("<iiiid")
+    POWER_UP = struct.Struct("<ididBdi")  # y und prev_y sind nach dem Schweben Kommazahlen
+    PLATFORM_TYPES = ("normal", "bounce", "moving")
+    POWER_UP_TYPES = ("speed",)
+    
+    __slots__ = ("world", "platforms", "coins", "power_ups", "particles", "rng")
+    
+    def __init__(self, world, platforms, coins, power_ups, particles, rng):
+        self.world = world
+        self.platforms = platforms
+        self.coins = coins
+        self.power_ups = power_ups
+        self.particles = particles
+        self.rng = rng
     
-    # Animation
-    player_animation_frame = int(time_counter * 0.3) % 4
-    walk_offset = 1 if player_animation_frame < 2 else -1
+    def to_bytes(self):
+        particles = self.particles
+        version, internal, gauss_next = self.rng
+        chunks = [
+            self.HEADER.pack(self.MAGIC, self.VERSION),
+            self.WORLD.pack(*self.world, len(self.platforms), len(self.coins), len(self.power_ups), len(particles[0])),
+            self.RNG.pack(version, *internal, gauss_next is not None, gauss_next or 0.0),
+        ]
+        platform_types = self.PLATFORM_TYPES
+        for x, y, width, height, platform_type, original_x, direction, prev_x, prev_y in self.platforms:
+            chunks.append(self.PLATFORM.pack(x, y, width, height, platform_types.index(platform_type),
+                                             original_x, direction, prev_x, prev_y))
+        for coin in self.coins:
+            chunks.append(self.COIN.pack(*coin))
+        for x, y, prev_x, prev_y, power_up_type, animation, key in self.power_ups:
+            chunks.append(self.POWER_UP.pack(x, y, prev_x, prev_y, self.POWER_UP_TYPES.index(power_up_type), animation, key))
+        chunks.extend(array.tobytes() for array in particles[:-1])
+        chunks.append(struct.pack("<I", particles[-1]))
+        return b"".join(chunks)
     
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("kein DoodlePlumber-Snapshot (Version %d)" % cls.VERSION)
+        pos = cls.HEADER.size
+        values = cls.WORLD.unpack_from(data, pos)
+        pos += cls.WORLD.size
+        world, (platform_count, coin_count, power_up_count, particle_count) = values[:-4], values[-4:]
+        world = world[:7] + (bool(world[7]),) + world[8:15] + (bool(world[15]),) + world[16:]
+        rng = cls.RNG.unpack_from(data, pos)
+        pos += cls.RNG.size
+        rng = (rng[0], rng[1:626], rng[627] if rng[626] else None)
+        
+        platforms = []
+        for _ in range(platform_count):
+            x, y, width, height, platform_type, original_x, direction, prev_x, prev_y = cls.PLATFORM.unpack_from(data, pos)
+            platforms.append((x, y, width, height, cls.PLATFORM_TYPES[platform_type], original_x, direction, prev_x, prev_y))
+            pos += cls.PLATFORM.size
+        coins = []
+        for _ in range(coin_count):
+            coins.append(cls.COIN.unpack_from(data, pos))
+            pos += cls.COIN.size
+        power_ups = []
+        for _ in range(power_up_count):
+            x, y, prev_x, prev_y, power_up_type, animation, key = cls.POWER_UP.unpack_from(data, pos)
+            power_ups.append((x, y, prev_x, prev_y, cls.POWER_UP_TYPES[power_up_type], animation, key))
+            pos += cls.POWER_UP.size
+        
+        # Partikel-Arrays mit denselben Typen wie in ParticleSystem
+        particles = []
+        for dtype, width in ((np.float64, 1), (np.float64, 1), (np.float64, 1), (np.float64, 1), (np.int32, 1), (np.uint8, 3)):
+            size = particle_count * width * np.dtype(dtype).itemsize
+            array = np.frombuffer(data, dtype, particle_count * width, pos).copy()
+            particles.append(array.reshape(particle_count, 3) if width == 3 else array)
+            pos += size
+        dropped, = struct.unpack_from("<I", data, pos)
+        return cls(world, platforms, coins, power_ups, tuple(particles) + (dropped,), rng)
+    
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+def climber_inputs(world):
+    """Einfacher, deterministischer Skript-Bot: steuert auf die nächste Plattform über dem Spieler zu"""
+    player = world.player
+    target = None
+    for platform in world.platform_index.query(player.bottom - 160, player.bottom):
+        if platform.rect.top < player.bottom and (target is None or platform.rect.top > target.rect.top):
+            target = platform
+    if target is None:
+        return 0
+    if target.rect.centerx < player.centerx - 8:
+        return INPUT_LEFT
+    if target.rect.centerx > player.centerx + 8:
+        return INPUT_RIGHT
+    return 0
+
+def user_data_dir():
+    """Verzeichnis für Statistiken und Traces pro Benutzer - nicht das Arbeitsverzeichnis,
+    sonst liegen nach jedem Start Dateien im Checkout"""
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "DoodlePlumber")
+
+def ensure_parent_dir(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+# Statistik-Datenbank: Schreib-Thread bündelt bis zu so viele Läufe pro Transaktion
+STATS_BATCH = 256
+STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    seed TEXT NOT NULL,  -- Seeds sind u64, SQLite-INTEGER nur i64
+    score REAL NOT NULL,
+    coins INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    avg_frame_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC);
+CREATE INDEX IF NOT EXISTS runs_played_at ON runs (played_at);
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL,
+    total_score REAL NOT NULL,
+    best_score REAL NOT NULL,
+    total_coins INTEGER NOT NULL,
+    total_duration REAL NOT NULL
+);
+"""
+
+class RunStore:
+    """High-Scores und Statistiken aller Läufe in einer lokalen SQLite-Datenbank.
+    
+    record() stellt einen Lauf nur in eine Queue, ein Hintergrund-Thread
+    schreibt gesammelt in einer Transaktion - der Frame wartet nie auf die
+    Platte. Lesende Abfragen nutzen eine eigene Verbindung. Die Tabelle
+    daily wird beim Schreiben mitgeführt, damit Trends auch bei
+    hunderttausenden Läufen nur wenige Zeilen lesen.
+    """
+    COLUMNS = ("played_at", "seed", "score", "coins", "height", "ticks", "duration", "avg_frame_ms")
+    
+    def __init__(self, path):
+        self.path = path
+        ensure_parent_dir(path)
+        self.queue = queue.Queue()
+        self.reader = self.connect()
+        self.reader.executescript(STATS_SCHEMA)
+        self.thread = threading.Thread(target=self.run, name="stats-writer", daemon=True)
+        self.thread.start()
+    
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    def record(self, **run):
+        """Lauf zum Schreiben einreihen; fehlende Felder: played_at = jetzt"""
+        run.setdefault("played_at", time.time())
+        run["seed"] = str(run["seed"])
+        self.queue.put(tuple(run[column] for column in self.COLUMNS))
+    
+    def run(self):
+        connection = self.connect()
+        insert = "INSERT INTO runs (%s) VALUES (%s)" % (", ".join(self.COLUMNS), ", ".join("?" * len(self.COLUMNS)))
+        upsert = """
+            INSERT INTO daily (day, runs, total_score, best_score, total_coins, total_duration)
+            VALUES (date(?, 'unixepoch', 'localtime'), 1, ?, ?, ?, ?)
+            ON CONFLICT (day) DO UPDATE SET
+                runs = runs + 1,
+                total_score = total_score + excluded.total_score,
+                best_score = max(best_score, excluded.best_score),
+                total_coins = total_coins + excluded.total_coins,
+                total_duration = total_duration + excluded.total_duration
+        """
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            while len(batch) < STATS_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            closing = len(rows) < len(batch)
+            if rows:
+                try:
+                    with connection:
+                        connection.executemany(insert, rows)
+                        connection.executemany(upsert, [(row[0], row[2], row[2], row[3], row[6]) for row in rows])
+                except sqlite3.Error as error:
+                    print(f"Statistik nicht gespeichert ({len(rows)} Läufe): {error}", file=sys.stderr)
+            for _ in batch:
+                self.queue.task_done()
+        connection.close()
+    
+    def flush(self):
+        """Warten, bis alle eingereihten Läufe geschrieben sind"""
+        self.queue.join()
+    
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.reader.close()
+    
+    def high_score(self):
+        row = self.reader.execute("SELECT MAX(score) FROM runs").fetchone()
+        return row[0] or 0
+    
+    def leaderboard(self, limit=10):
+        """Beste Läufe, über den Index runs_score ohne Sortieren der Tabelle"""
+        cursor = self.reader.execute(
+            "SELECT played_at, seed, score, coins, height, duration FROM runs ORDER BY score DESC LIMIT ?", (limit,))
+        return cursor.fetchall()
+    
+    def trend(self, days=14):
+        """Pro Tag: Anzahl Läufe, Durchschnitt, Bestwert, Münzen pro Lauf - neueste zuerst"""
+        cursor = self.reader.execute(
+            "SELECT day, runs, total_score / runs, best_score, CAST(total_coins AS REAL) / runs, total_duration / runs "
+            "FROM daily ORDER BY day DESC LIMIT ?", (days,))
+        return cursor.fetchall()
+    
+    def recent(self, limit=20):
+        cursor = self.reader.execute(
+            "SELECT played_at, seed, score, coins, height, duration, avg_frame_ms FROM runs "
+            "ORDER BY played_at DESC LIMIT ?", (limit,))
+        return cursor.fetchall()
+
+def print_stats(store):
+    """Bestenliste und Tagestrend auf der Konsole"""
+    print("Bestenliste")
+    for rank, (played_at, seed, score, coins, height, duration) in enumerate(store.leaderboard(), 1):
+        day = time.strftime("%Y-%m-%d", time.localtime(played_at))
+        print(f"{rank:>3}. {int(score):>7}  {coins:>3} Coins  {height:>6} px  {duration:6.1f}s  Seed {seed}  {day}")
+    print("Trend")
+    for day, runs, average, best, coins, duration in store.trend():
+        print(f"{day}  {runs:>5} Läufe  Schnitt {average:8.1f}  Best {int(best):>7}  "
+              f"{coins:4.1f} Coins  {duration:6.1f}s")
+
+# Render-Zustand - wird erst von init_display() angelegt, damit das Modul headless importierbar bleibt
+presenter = None
+screen = None  # Zeichenfläche in logischer Auflösung, siehe Presenter
+dirty = None
+background = None
+font = big_font = title_font = small_font = tiny_font = None
+
+# Qualitätsstufen, beste zuerst - der QualityGovernor wählt je nach Frame-Zeit
+QUALITY_LEVELS = [
+    {"name": "hoch", "grass": True, "shadows": True, "clouds": CLOUD_COUNT, "particles": PARTICLE_CAPACITY, "coin_pulse": True},
+    {"name": "mittel", "grass": True, "shadows": True, "clouds": CLOUD_COUNT // 2, "particles": 2000, "coin_pulse": True},
+    {"name": "niedrig", "grass": False, "shadows": True, "clouds": CLOUD_COUNT // 4, "particles": 500, "coin_pulse": False},
+    {"name": "minimal", "grass": False, "shadows": False, "clouds": 0, "particles": 100, "coin_pulse": False},
+]
+quality = QUALITY_LEVELS[0]
+
+class DirtyRectTracker:
+    """Sammelt pro Frame geänderte Bereiche und präsentiert nur diese.
+    
+    Bereiche des vorigen Frames werden mit präsentiert, damit alte Positionen
+    verschwinden. Ein voller Flip passiert beim ersten Frame, bei
+    Zustandswechseln und wenn die Kamera scrollt.
+    """
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.rects = []
+        self.previous = []
+        self.full = True
+        self.last_fraction = 1.0
+        self.fraction_sum = 0.0
+        self.frames = 0
+    
+    def mark(self, rect):
+        if self.enabled:
+            self.rects.append(pygame.Rect(rect))
+        return rect
+    
+    def mark_full(self):
+        self.full = True
+    
+    def average_fraction(self):
+        return self.fraction_sum / self.frames if self.frames else 0.0
+    
+    def present(self):
+        if not self.enabled:
+            presenter.present()
+            return
+        
+        screen_rect = screen.get_rect()
+        if self.full:
+            presenter.present()
+            fraction = 1.0
+        else:
+            merged = []
+            for rect in self.previous + self.rects:
+                rect = rect.clip(screen_rect)
+                if not rect.width or not rect.height:
+                    continue
+                # Überlappende Bereiche zusammenfassen, damit nichts doppelt zählt
+                hit = rect.collidelist(merged)
+                while hit != -1:
+                    rect.union_ip(merged.pop(hit))
+                    hit = rect.collidelist(merged)
+                merged.append(rect)
+            presenter.present(merged)
+            fraction = sum(r.width * r.height for r in merged) / (screen_rect.width * screen_rect.height)
+        
+        self.last_fraction = fraction
+        self.fraction_sum += fraction
+        self.frames += 1
+        self.previous = self.rects
+        self.rects = []
+        self.full = False
+
+# Skalierung beim Präsentieren: "integer" = ganzzahliger Faktor mit scharfen Pixeln, "smooth" = fensterfüllend geglättet
+SCALE_MODES = ("integer", "smooth")
+
+class Presenter:
+    """Bringt die Szene aus der logischen Auflösung WIDTH x HEIGHT ins Fenster.
+    
+    Gezeichnet wird immer in `surface` mit fester Größe, die Zeichenkosten
+    hängen also nicht von der Fenstergröße ab. present() skaliert das fertige
+    Bild in einem einzigen Schritt direkt in den Zielbereich des Fensters,
+    die Ränder bleiben schwarz. Hat das Fenster genau die logische Größe,
+    ist `surface` das Fenster selbst und es wird nichts kopiert.
+    """
+    def __init__(self, size=None, fullscreen=False, scale="integer"):
+        self.size = size or (WIDTH, HEIGHT)
+        self.fullscreen = fullscreen
+        self.scale = scale
+        self.window = None
+        self.surface = None
+        self.offscreen = None
+        self.target = None  # Bereich des skalierten Bildes im Fenster, None = direkt gezeichnet
+        self.view = None
+        self.smooth = False
+        self.open()
+    
+    def open(self):
+        """Fenster (neu) anlegen - Vollbild in Desktop-Auflösung oder skalierbares Fenster"""
+        if self.fullscreen:
+            pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        elif pygame.display.set_mode(self.size, pygame.RESIZABLE).get_size() != self.size:
+            # Beim Verlassen des Vollbilds übernimmt pygame die Fenstergröße erst beim zweiten Aufruf
+            pygame.display.set_mode(self.size, pygame.RESIZABLE)
+        self.layout()
+    
+    def toggle_fullscreen(self):
+        self.fullscreen = not self.fullscreen
+        self.open()
+    
+    def layout(self):
+        """Skalierung und Zielbereich für die aktuelle Fenstergröße bestimmen"""
+        self.window = pygame.display.get_surface()
+        width, height = self.window.get_size()
+        if not self.fullscreen:
+            self.size = (width, height)  # gilt auch nach dem Verlassen des Vollbilds wieder
+        if (width, height) == (WIDTH, HEIGHT):
+            self.surface = self.window
+            self.target = self.view = None
+            return
+        
+        factor = min(width / WIDTH, height / HEIGHT)
+        # Kleiner als die logische Größe geht nur geglättet
+        self.smooth = self.scale == "smooth" or factor < 1
+        if not self.smooth:
+            factor = int(factor)
+        self.target = pygame.Rect(0, 0, max(1, int(WIDTH * factor)), max(1, int(HEIGHT * factor)))
+        self.target.center = (width // 2, height // 2)
+        self.view = self.window.subsurface(self.target)
+        if self.offscreen is None:
+            self.offscreen = pygame.Surface((WIDTH, HEIGHT), 0, self.window)
+        self.surface = self.offscreen
+        self.window.fill(UI_BLACK)
+    
+    def to_window(self, rect):
+        """Logisches Rechteck in Fensterkoordinaten (aufgerundet, damit keine Kante fehlt)"""
+        scale_x = self.target.width / WIDTH
+        scale_y = self.target.height / HEIGHT
+        left = self.target.x + int(rect.left * scale_x)
+        top = self.target.y + int(rect.top * scale_y)
+        right = self.target.x + math.ceil(rect.right * scale_x)
+        bottom = self.target.y + math.ceil(rect.bottom * scale_y)
+        return pygame.Rect(left, top, right - left, bottom - top)
+    
+    def present(self, rects=None):
+        """Bild anzeigen; rects sind geänderte Bereiche in logischen Koordinaten (None = alles)"""
+        if self.target is not None:
+            if self.smooth:
+                pygame.transform.smoothscale(self.surface, self.target.size, self.view)
+            else:
+                pygame.transform.scale(self.surface, self.target.size, self.view)
+            if rects is not None:
+                rects = [self.to_window(rect) for rect in rects]
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+# Text-System: Fonts nur einmal laden, gerenderte Texte wiederverwenden
+_font_cache = {}
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+
+def get_font(face, size, bold=False):
+    """Liefere einen Font pro (Schrift, Größe, fett).
+    
+    Liegt fonts/<Schrift>.ttf bzw. <Schrift>-Bold.ttf neben dem Skript, wird die
+    Datei direkt geladen und die Suche nach Systemschriften entfällt. Sonst wie
+    bisher SysFont - gleiche Schrift und Größe wie vor dem Font-Verzeichnis,
+    ohne installierte Schrift dessen eigener Rückfall auf freesansbold.
+    """
+    key = (face, size, bold)
+    cached = _font_cache.get(key)
+    if cached is None:
+        path = os.path.join(FONT_DIR, f"{face}-Bold.ttf" if bold else f"{face}.ttf")
+        if bold and not os.path.exists(path):
+            path = os.path.join(FONT_DIR, f"{face}.ttf")
+        if os.path.exists(path):
+            cached = pygame.font.Font(path, size)
+            cached.set_bold(bold and not path.endswith("-Bold.ttf"))
+        else:
+            cached = pygame.font.SysFont(face, size, bold=bold)
+        _font_cache[key] = cached
+    return cached
+
+class SurfaceCache:
+    """LRU-Cache für vorgerenderte Surfaces mit Größenlimit und Hit/Miss-Zählern"""
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, create):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        self.misses += 1
+        surface = create()
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+    
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+class TextCache(SurfaceCache):
+    """LRU-Cache für gerenderte Text-Surfaces, Schlüssel (font, text, color)"""
+    def render(self, font, text, color):
+        return self.get((font, text, color), lambda: font.render(text, True, color))
+
+text_cache = TextCache()
+
+def render_text(font, text, color):
+    """Gerenderten Text aus dem gemeinsamen Cache holen"""
+    return text_cache.render(font, text, color)
+
+def draw_cloud(surface, x, y, size):
+    """Zeichne eine einfache, cleane Wolke"""
+    pygame.draw.circle(surface, CLOUD_WHITE, (int(x), int(y)), int(size * 0.6))
+    pygame.draw.circle(surface, CLOUD_WHITE, (int(x - size * 0.4), int(y)), int(size * 0.4))
+    pygame.draw.circle(surface, CLOUD_WHITE, (int(x + size * 0.4), int(y)), int(size * 0.4))
+    pygame.draw.circle(surface, CLOUD_WHITE, (int(x - size * 0.2), int(y - size * 0.3)), int(size * 0.35))
+    pygame.draw.circle(surface, CLOUD_WHITE, (int(x + size * 0.2), int(y - size * 0.3)), int(size * 0.35))
+
+cloud_cache = SurfaceCache(max_size=64)
+
+def get_cloud_surface(size):
+    """Wolke einmal in eine Alpha-Surface rendern (Mittelpunkt bei (size, size))"""
+    def bake():
+        surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+        draw_cloud(surface, size, size, size)
+        return surface
+    return cloud_cache.get(size, bake)
+
+class ParallaxBackground:
+    """Himmel und Wolken als vorgerenderte, kachelbare Ebenen.
+    
+    Jede Ebene ist eine bildschirmgroße Surface, die horizontal driftet und
+    beim Kamera-Scroll um ihre Tiefe verschoben wird. Pro Frame kostet das
+    höchstens vier Blits pro Ebene - unabhängig von der Anzahl Wolken.
+    """
+    def __init__(self, cloud_count=CLOUD_COUNT, layers=BACKGROUND_LAYERS, seed=None):
+        self.cloud_count = cloud_count
+        self.drift = True
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.layer_config = layers
+        self.layers = []
+        self.build(layers)
+    
+    def set_cloud_count(self, cloud_count):
+        """Ebenen mit weniger/mehr Wolken neu backen - gleiche Wolken, Scroll-Position bleibt"""
+        if cloud_count == self.cloud_count:
+            return
+        positions = [(layer['x'], layer['y']) for layer in self.layers]
+        self.cloud_count = cloud_count
+        self.build(self.layer_config)
+        for layer, (x, y) in zip(self.layers, positions):
+            layer['x'], layer['y'] = x, y
+    
+    def build(self, layers):
+        self.rng = random.Random(self.seed)
+        self.layers = []
+        for index, (depth, speed) in enumerate(layers):
+            if index == 0:
+                # Hinterste Ebene enthält den Himmel und ist deckend
+                surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+                surface.fill(SKY_BLUE)
+            else:
+                surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA).convert_alpha()
+            self.layers.append({'surface': surface, 'depth': depth, 'speed': speed, 'x': 0.0, 'y': 0.0})
+        
+        if not self.layers:
+            return
+        
+        # Wolken reihum auf die Ebenen verteilen, an den Rändern umbrechen
+        for i in range(self.cloud_count):
+            layer = self.layers[i % len(self.layers)]
+            size = self.rng.randint(40, 80)
+            x = self.rng.randint(0, WIDTH)
+            y = self.rng.randint(50, HEIGHT - 100)
+            cloud = get_cloud_surface(size)
+            for dx in (-WIDTH, 0, WIDTH):
+                for dy in (-HEIGHT, 0, HEIGHT):
+                    layer['surface'].blit(cloud, (x - size + dx, y - size + dy))
+    
+    def scroll(self, offset):
+        """Kamera-Verschiebung (Pixel nach unten) auf die Ebenen übertragen"""
+        for layer in self.layers:
+            layer['y'] += offset * layer['depth']
+    
+    def update(self):
+        """Wolken um einen Tick weiterdriften lassen"""
+        if self.drift:
+            for layer in self.layers:
+                layer['x'] += layer['speed']
+    
+    def draw(self, surface):
+        if not self.layers:
+            surface.fill(SKY_BLUE)
+            return
+        
+        for layer in self.layers:
+            ox = int(layer['x']) % WIDTH
+            oy = int(layer['y']) % HEIGHT
+            image = layer['surface']
+            surface.blit(image, (ox, oy))
+            if ox:
+                surface.blit(image, (ox - WIDTH, oy))
+            if oy:
+                surface.blit(image, (ox, oy - HEIGHT))
+                if ox:
+                    surface.blit(image, (ox - WIDTH, oy - HEIGHT))
+
+def draw_background():
+    """Zeichne cleanen Himmel mit Wolken"""
+    background.draw(screen)
+
+def draw_mario_procedural(surface, x, y, facing_right, animation_frame, shadow=True):
+    """Zeichne größeren, detaillierten Mario-Charakter aus Primitiven"""
     # Schatten
-    pygame.draw.ellipse(screen, SHADOW_GRAY, (x + 4, y + player_height - 4, player_width - 8, 8))
+    if shadow:
+        pygame.draw.ellipse(surface, SHADOW_GRAY, (x + 4, y + player_height - 4, player_width - 8, 8))
     
     # Füße (Schuhe)
-    if player_facing_right:
-        pygame.draw.rect(screen, PLAYER_BROWN, (x + 2, y + 40, 12, 8))
-        pygame.draw.rect(screen, PLAYER_BROWN, (x + 26, y + 40, 12, 8))
+    if facing_right:
+        pygame.draw.rect(surface, PLAYER_BROWN, (x + 2, y + 40, 12, 8))
+        pygame.draw.rect(surface, PLAYER_BROWN, (x + 26, y + 40, 12, 8))
     else:
-        pygame.draw.rect(screen, PLAYER_BROWN, (x + 2, y + 40, 12, 8))
-        pygame.draw.rect(screen, PLAYER_BROWN, (x + 26, y + 40, 12, 8))
+        pygame.draw.rect(surface, PLAYER_BROWN, (x + 2, y + 40, 12, 8))
+        pygame.draw.rect(surface, PLAYER_BROWN, (x + 26, y + 40, 12, 8))
     
     # Beine (blaue Hose)
     leg_rect = pygame.Rect(x + 8, y + 28, 24, 16)
-    pygame.draw.rect(screen, PLAYER_BLUE, leg_rect)
+    pygame.draw.rect(surface, PLAYER_BLUE, leg_rect)
     
     # Körper/Shirt (rot)
     body_rect = pygame.Rect(x + 4, y + 16, 32, 20)
-    pygame.draw.rect(screen, PLAYER_RED, body_rect)
+    pygame.draw.rect(surface, PLAYER_RED, body_rect)
     
     # Träger (gelb)
-    pygame.draw.rect(screen, PLAYER_YELLOW, (x + 12, y + 18, 6, 12))
-    pygame.draw.rect(screen, PLAYER_YELLOW, (x + 22, y + 18, 6, 12))
+    pygame.draw.rect(surface, PLAYER_YELLOW, (x + 12, y + 18, 6, 12))
+    pygame.draw.rect(surface, PLAYER_YELLOW, (x + 22, y + 18, 6, 12))
     
     # Arme
-    if player_facing_right:
+    if facing_right:
         # Rechter Arm
-        pygame.draw.rect(screen, PLAYER_SKIN, (x + 32, y + 20, 8, 12))
+        pygame.draw.rect(surface, PLAYER_SKIN, (x + 32, y + 20, 8, 12))
         # Linker Arm (hinter Körper)
-        pygame.draw.rect(screen, PLAYER_SKIN, (x - 4, y + 22, 8, 10))
+        pygame.draw.rect(surface, PLAYER_SKIN, (x - 4, y + 22, 8, 10))
     else:
         # Linker Arm
-        pygame.draw.rect(screen, PLAYER_SKIN, (x - 4, y + 20, 8, 12))
+        pygame.draw.rect(surface, PLAYER_SKIN, (x - 4, y + 20, 8, 12))
         # Rechter Arm (hinter Körper)
-        pygame.draw.rect(screen, PLAYER_SKIN, (x + 32, y + 22, 8, 10))
+        pygame.draw.rect(surface, PLAYER_SKIN, (x + 32, y + 22, 8, 10))
     
     # Kopf
     head_rect = pygame.Rect(x + 8, y + 4, 24, 20)
-    pygame.draw.rect(screen, PLAYER_SKIN, head_rect)
+    pygame.draw.rect(surface, PLAYER_SKIN, head_rect)
     
     # Mütze
     hat_rect = pygame.Rect(x + 6, y, 28, 12)
-    pygame.draw.rect(screen, PLAYER_RED, hat_rect)
+    pygame.draw.rect(surface, PLAYER_RED, hat_rect)
     
     # Mützen-Schirm
-    if player_facing_right:
-        pygame.draw.rect(screen, PLAYER_RED, (x + 30, y + 6, 8, 6))
+    if facing_right:
+        pygame.draw.rect(surface, PLAYER_RED, (x + 30, y + 6, 8, 6))
     else:
-        pygame.draw.rect(screen, PLAYER_RED, (x + 2, y + 6, 8, 6))
+        pygame.draw.rect(surface, PLAYER_RED, (x + 2, y + 6, 8, 6))
     
     # Augen
-    if player_facing_right:
-        pygame.draw.circle(screen, UI_BLACK, (x + 16, y + 12), 3)
-        pygame.draw.circle(screen, UI_BLACK, (x + 24, y + 12), 3)
+    if facing_right:
+        pygame.draw.circle(surface, UI_BLACK, (x + 16, y + 12), 3)
+        pygame.draw.circle(surface, UI_BLACK, (x + 24, y + 12), 3)
         # Pupillen
-        pygame.draw.circle(screen, UI_WHITE, (x + 17, y + 11), 1)
-        pygame.draw.circle(screen, UI_WHITE, (x + 25, y + 11), 1)
+        pygame.draw.circle(surface, UI_WHITE, (x + 17, y + 11), 1)
+        pygame.draw.circle(surface, UI_WHITE, (x + 25, y + 11), 1)
     else:
-        pygame.draw.circle(screen, UI_BLACK, (x + 16, y + 12), 3)
-        pygame.draw.circle(screen, UI_BLACK, (x + 24, y + 12), 3)
-        pygame.draw.circle(screen, UI_WHITE, (x + 15, y + 11), 1)
-        pygame.draw.circle(screen, UI_WHITE, (x + 23, y + 11), 1)
+        pygame.draw.circle(surface, UI_BLACK, (x + 16, y + 12), 3)
+        pygame.draw.circle(surface, UI_BLACK, (x + 24, y + 12), 3)
+        pygame.draw.circle(surface, UI_WHITE, (x + 15, y + 11), 1)
+        pygame.draw.circle(surface, UI_WHITE, (x + 23, y + 11), 1)
     
     # Nase
-    pygame.draw.circle(screen, (255, 200, 150), (x + 20, y + 16), 2)
+    pygame.draw.circle(surface, (255, 200, 150), (x + 20, y + 16), 2)
     
     # Schnurrbart
-    if player_facing_right:
-        pygame.draw.rect(screen, PLAYER_BROWN, (x + 14, y + 18, 12, 3))
+    if facing_right:
+        pygame.draw.rect(surface, PLAYER_BROWN, (x + 14, y + 18, 12, 3))
     else:
-        pygame.draw.rect(screen, PLAYER_BROWN, (x + 14, y + 18, 12, 3))
+        pygame.draw.rect(surface, PLAYER_BROWN, (x + 14, y + 18, 12, 3))
     
     # "M" auf der Mütze
-    m_font = pygame.font.SysFont("Arial", 12, bold=True)
-    m_text = m_font.render("M", True, UI_WHITE)
+    m_text = render_text(small_font, "M", UI_WHITE)
     m_rect = m_text.get_rect(center=(x + 20, y + 6))
-    screen.blit(m_text, m_rect)
-
-def draw_enhanced_platforms():
-    """Zeichne verschiedene Plattform-Typen"""
-    for platform in platforms:
-        # Schatten
-        shadow_rect = pygame.Rect(platform.rect.x + 2, platform.rect.y + 2, platform.rect.width, platform.rect.height)
-        pygame.draw.rect(screen, SHADOW_GRAY, shadow_rect)
-        
-        # Bestimme Plattform-Typ und zeichne entsprechend
-        if platform.type == "bounce":
-            # Sprungfeder-Plattform (Gold)
-            pygame.draw.rect(screen, PLATFORM_SPECIAL, platform.rect)
-            pygame.draw.rect(screen, UI_BLACK, platform.rect, 2)
-            # Sprungfeder-Symbol
-            spring_x = platform.rect.centerx
-            pygame.draw.line(screen, UI_BLACK, (spring_x - 10, platform.rect.y + 5), (spring_x + 10, platform.rect.y + 5), 3)
-            pygame.draw.line(screen, UI_BLACK, (spring_x - 8, platform.rect.y + 8), (spring_x + 8, platform.rect.y + 8), 2)
-            pygame.draw.line(screen, UI_BLACK, (spring_x - 6, platform.rect.y + 11), (spring_x + 6, platform.rect.y + 11), 2)
-        elif platform.type == "moving":
-            # Bewegliche Plattform (Blau)
-            pygame.draw.rect(screen, (100, 100, 255), platform.rect)
-            pygame.draw.rect(screen, UI_BLACK, platform.rect, 2)
-            # Pfeil-Symbole
-            pygame.draw.polygon(screen, UI_WHITE, [(platform.rect.x + 10, platform.rect.centery), 
-                                                 (platform.rect.x + 20, platform.rect.centery - 5), 
-                                                 (platform.rect.x + 20, platform.rect.centery + 5)])
-            pygame.draw.polygon(screen, UI_WHITE, [(platform.rect.right - 10, platform.rect.centery), 
-                                                 (platform.rect.right - 20, platform.rect.centery - 5), 
-                                                 (platform.rect.right - 20, platform.rect.centery + 5)])
-        else:
-            # Normale Plattform (Grün)
-            pygame.draw.rect(screen, PLATFORM_GREEN, platform.rect)
-            pygame.draw.rect(screen, PLATFORM_DARK, platform.rect, 2)
-            
-            # Gras-Textur
-            for grass_x in range(platform.rect.x + 5, platform.rect.right - 5, 8):
-                pygame.draw.line(screen, (60, 179, 60), (grass_x, platform.rect.y), (grass_x, platform.rect.y - 3), 2)
-                pygame.draw.line(screen, (60, 179, 60), (grass_x + 2, platform.rect.y), (grass_x + 2, platform.rect.y - 2), 1)
+    surface.blit(m_text, m_rect)
+
+# Sprite-Atlas für den Spieler: jede Variante (Richtung, Animationsframe) nur einmal zeichnen
+PLAYER_ANIMATION_FRAMES = 4
+PLAYER_SPRITE_PAD = 4  # Arme und Schatten ragen über das Spieler-Rechteck hinaus
+PLAYER_BASE_SIZE = (40, 48)  # Feste Teile von draw_mario_procedural passen in diese Größe
+debug_procedural_player = False  # F2: alten Zeichenweg zum Vergleich verwenden
+
+player_atlas = None
+player_atlas_size = None
+player_atlas_cell = (0, 0)
+player_atlas_shadow = None
+ghost_atlas = None  # halbtransparente Kopie des Atlas für das Ghost-Rennen
+ghost_atlas_source = None
+GHOST_ALPHA = 110
+
+def build_player_atlas():
+    """Backe alle Spieler-Varianten in eine Textur (Zeile = Richtung, Spalte = Frame)"""
+    global player_atlas, player_atlas_size, player_atlas_cell, player_atlas_shadow
+    
+    pad = PLAYER_SPRITE_PAD
+    cell_w = max(player_width, PLAYER_BASE_SIZE[0]) + pad * 2
+    cell_h = max(player_height, PLAYER_BASE_SIZE[1]) + pad * 2
+    
+    atlas = pygame.Surface((cell_w * PLAYER_ANIMATION_FRAMES, cell_h * 2), pygame.SRCALPHA)
+    for row, facing_right in enumerate((True, False)):
+        for frame in range(PLAYER_ANIMATION_FRAMES):
+            atlas.set_clip(pygame.Rect(frame * cell_w, row * cell_h, cell_w, cell_h))
+            draw_mario_procedural(atlas, frame * cell_w + pad, row * cell_h + pad, facing_right, frame, quality["shadows"])
+    atlas.set_clip(None)
+    
+    player_atlas = atlas
+    player_atlas_size = (player_width, player_height)
+    player_atlas_shadow = quality["shadows"]
+    player_atlas_cell = (cell_w, cell_h)
+
+def draw_enhanced_mario(world, time_counter, alpha=1.0):
+    """Zeichne den Spieler als einzelnen Blit aus dem Sprite-Atlas"""
+    player = world.player
+    prev_x, prev_y = world.player_prev
+    # Beim Umbruch am Bildschirmrand nicht quer über den Bildschirm interpolieren
+    if abs(player.x - prev_x) > WIDTH // 2:
+        prev_x = player.x
+    x = int(interpolate(prev_x, player.x, alpha))
+    y = int(interpolate(prev_y, player.y, alpha) - world.camera.render_y(alpha))
+    animation_frame = int(time_counter * 0.3) % PLAYER_ANIMATION_FRAMES
+    dirty.mark(pygame.Rect(x, y, player.width, player.height).inflate(PLAYER_SPRITE_PAD * 2, PLAYER_SPRITE_PAD * 2))
+    
+    if debug_procedural_player:
+        draw_mario_procedural(screen, x, y, world.player_facing_right, animation_frame, quality["shadows"])
+        return
+    
+    # Atlas neu backen, falls sich die Spielergröße oder die Qualitätsstufe geändert hat
+    if (player_atlas is None or player_atlas_size != (player_width, player_height)
+            or player_atlas_shadow != quality["shadows"]):
+        build_player_atlas()
+    
+    cell_w, cell_h = player_atlas_cell
+    row = 0 if world.player_facing_right else 1
+    area = pygame.Rect(animation_frame * cell_w, row * cell_h, cell_w, cell_h)
+    screen.blit(player_atlas, (x - PLAYER_SPRITE_PAD, y - PLAYER_SPRITE_PAD), area)
+
+def draw_ghosts(ghosts, camera_y, time_counter):
+    """Andere Spieler aus dem Ghost-Rennen halbtransparent, mit Punktestand darüber"""
+    global ghost_atlas, ghost_atlas_source
+    if player_atlas is None:
+        build_player_atlas()
+    if ghost_atlas_source is not player_atlas:
+        ghost_atlas = player_atlas.copy()
+        ghost_atlas.fill((255, 255, 255, GHOST_ALPHA), special_flags=pygame.BLEND_RGBA_MULT)
+        ghost_atlas_source = player_atlas
+    
+    cell_w, cell_h = player_atlas_cell
+    animation_frame = int(time_counter * 0.3) % PLAYER_ANIMATION_FRAMES
+    for _, x, y, score, facing_right, game_over in ghosts:
+        y -= camera_y
+        if game_over or not -cell_h < y < HEIGHT:
+            continue
+        x, y = int(x), int(y)
+        area = pygame.Rect(animation_frame * cell_w, (0 if facing_right else 1) * cell_h, cell_w, cell_h)
+        dirty.mark(screen.blit(ghost_atlas, (x - PLAYER_SPRITE_PAD, y - PLAYER_SPRITE_PAD), area))
+        label = render_text(tiny_font, str(score), UI_BLACK)
+        dirty.mark(screen.blit(label, label.get_rect(midbottom=(x + player_width // 2, y - PLAYER_SPRITE_PAD))))
+
+def draw_platform_procedural(surface, rect, platform_type, grass=True, shadow=True):
+    """Zeichne eine Plattform (inkl. Schatten) aus Primitiven"""
+    # Schatten
+    if shadow:
+        shadow_rect = pygame.Rect(rect.x + 2, rect.y + 2, rect.width, rect.height)
+        pygame.draw.rect(surface, SHADOW_GRAY, shadow_rect)
+    
+    # Bestimme Plattform-Typ und zeichne entsprechend
+    if platform_type == "bounce":
+        # Sprungfeder-Plattform (Gold)
+        pygame.draw.rect(surface, PLATFORM_SPECIAL, rect)
+        pygame.draw.rect(surface, UI_BLACK, rect, 2)
+        # Sprungfeder-Symbol
+        spring_x = rect.centerx
+        pygame.draw.line(surface, UI_BLACK, (spring_x - 10, rect.y + 5), (spring_x + 10, rect.y + 5), 3)
+        pygame.draw.line(surface, UI_BLACK, (spring_x - 8, rect.y + 8), (spring_x + 8, rect.y + 8), 2)
+        pygame.draw.line(surface, UI_BLACK, (spring_x - 6, rect.y + 11), (spring_x + 6, rect.y + 11), 2)
+    elif platform_type == "moving":
+        # Bewegliche Plattform (Blau)
+        pygame.draw.rect(surface, (100, 100, 255), rect)
+        pygame.draw.rect(surface, UI_BLACK, rect, 2)
+        # Pfeil-Symbole
+        pygame.draw.polygon(surface, UI_WHITE, [(rect.x + 10, rect.centery), 
+                                             (rect.x + 20, rect.centery - 5), 
+                                             (rect.x + 20, rect.centery + 5)])
+        pygame.draw.polygon(surface, UI_WHITE, [(rect.right - 10, rect.centery), 
+                                             (rect.right - 20, rect.centery - 5), 
+                                             (rect.right - 20, rect.centery + 5)])
+    else:
+        # Normale Plattform (Grün)
+        pygame.draw.rect(surface, PLATFORM_GREEN, rect)
+        pygame.draw.rect(surface, PLATFORM_DARK, rect, 2)
+        
+        # Gras-Textur
+        if grass:
+            for grass_x in range(rect.x + 5, rect.right - 5, 8):
+                pygame.draw.line(surface, (60, 179, 60), (grass_x, rect.y), (grass_x, rect.y - 3), 2)
+                pygame.draw.line(surface, (60, 179, 60), (grass_x + 2, rect.y), (grass_x + 2, rect.y - 2), 1)
+
+# Plattform-Cache: (Typ, Breite, Höhe, Gras, Schatten) -> fertige Surface
+PLATFORM_SPRITE_TOP = 3  # Gras ragt über die Plattform hinaus
+PLATFORM_SHADOW_OFFSET = 2
+platform_cache = SurfaceCache(max_size=128)
+
+def bake_platform(platform_type, width, height, grass=True, shadow=True):
+    """Rendere eine Plattform einmal in eine transparente Surface"""
+    surface = pygame.Surface((width + PLATFORM_SHADOW_OFFSET, height + PLATFORM_SPRITE_TOP + PLATFORM_SHADOW_OFFSET), pygame.SRCALPHA)
+    draw_platform_procedural(surface, pygame.Rect(0, PLATFORM_SPRITE_TOP, width, height), platform_type, grass, shadow)
+    return surface
+
+def get_platform_surface(platform_type, width, height):
+    grass, shadow = quality["grass"], quality["shadows"]
+    return platform_cache.get((platform_type, width, height, grass, shadow),
+                              lambda: bake_platform(platform_type, width, height, grass, shadow))
 
-def draw_enhanced_ui():
+def draw_enhanced_platforms(world, alpha=1.0):
+    """Zeichne verschiedene Plattform-Typen - ein Blit pro Plattform"""
+    camera = world.camera
+    camera_y = camera.render_y(alpha)
+    # Kandidaten aus dem räumlichen Index (Anker Oberkante), zwei Plattformhöhen plus Gras und Schatten Rand
+    margin = 40 + PLATFORM_SPRITE_TOP + PLATFORM_SHADOW_OFFSET
+    for platform in world.platform_index.query(camera_y - margin, camera_y + camera.height + margin, world.candidates):
+        rect = platform.rect
+        # Nur Plattformen im Sichtfenster zeichnen
+        if not camera.is_visible(rect.top - PLATFORM_SPRITE_TOP, rect.bottom + PLATFORM_SHADOW_OFFSET,
+                                 margin=rect.height, alpha=alpha):
+            continue
+        x = int(interpolate(platform.prev_x, rect.x, alpha))
+        y = int(interpolate(platform.prev_y, rect.y, alpha) - camera_y)
+        sprite = get_platform_surface(platform.type, rect.width, rect.height)
+        dirty.mark(screen.blit(sprite, (x, y - PLATFORM_SPRITE_TOP)))
+
+def draw_enhanced_ui(world):
     """Zeichne verbessertes UI mit Münzen"""
     # Haupt UI Box
     ui_bg = pygame.Rect(10, 10, 200, 80)
     pygame.draw.rect(screen, UI_WHITE, ui_bg)
-    pygame.draw.rect(screen, UI_BLACK, ui_bg, 3)
+    dirty.mark(pygame.draw.rect(screen, UI_BLACK, ui_bg, 3))
     
     # Score
-    score_text = font.render(f"Score: {int(score)}", True, UI_BLACK)
+    score_text = render_text(font, f"Score: {int(world.score)}", UI_BLACK)
     screen.blit(score_text, (15, 15))
     
     # High Score
-    high_score_text = font.render(f"Best: {int(high_score)}", True, UI_BLACK)
+    high_score_text = render_text(font, f"Best: {int(world.high_score)}", UI_BLACK)
     screen.blit(high_score_text, (15, 40))
     
     # Münzen
-    coin_text = font.render(f"Coins: {coin_count}", True, COIN_GOLD)
+    coin_text = render_text(font, f"Coins: {world.coin_count}", COIN_GOLD)
     screen.blit(coin_text, (15, 65))
     
     # Münz-Symbol
     pygame.draw.circle(screen, COIN_GOLD, (180, 72), 8)
     pygame.draw.circle(screen, UI_BLACK, (180, 72), 8, 2)
-    coin_symbol = pygame.font.SysFont("Arial", 10, bold=True).render("$", True, UI_BLACK)
+    coin_symbol = render_text(tiny_font, "$", UI_BLACK)
     symbol_rect = coin_symbol.get_rect(center=(180, 72))
     screen.blit(coin_symbol, symbol_rect)
 
-def draw_menu():
+def draw_menu(time_counter):
     """Zeichne verbessertes Start-Menü"""
     draw_background()
     
     # Titel mit Schatten
-    title_shadow = title_font.render("CLIMB HIGH", True, UI_BLACK)
-    title_text = title_font.render("CLIMB HIGH", True, UI_WHITE)
+    title_shadow = render_text(title_font, "CLIMB HIGH", UI_BLACK)
+    title_text = render_text(title_font, "CLIMB HIGH", UI_WHITE)
     title_rect = title_text.get_rect(center=(WIDTH//2, HEIGHT//3))
     
     title_bg = pygame.Rect(title_rect.x - 15, title_rect.y - 10, title_rect.width + 30, title_rect.height + 20)
@@ -350,7 +2115,7 @@ def draw_menu():
     
     # Start Button mit Animation
     pulse = 1 + 0.1 * math.sin(time_counter * 0.1)
-    start_text = big_font.render("Press SPACE to Start", True, UI_BLACK)
+    start_text = render_text(big_font, "Press SPACE to Start", UI_BLACK)
     start_rect = start_text.get_rect(center=(WIDTH//2, HEIGHT//2))
     start_bg = pygame.Rect(start_rect.x - 15, start_rect.y - 8, start_rect.width + 30, start_rect.height + 16)
     
@@ -360,16 +2125,16 @@ def draw_menu():
         max(0, min(255, int(UI_WHITE[1] * pulse))),
         max(0, min(255, int(UI_WHITE[2] * pulse)))
     ), start_bg)
-    pygame.draw.rect(screen, UI_BLACK, start_bg, 3)
+    dirty.mark(pygame.draw.rect(screen, UI_BLACK, start_bg, 3))
     screen.blit(start_text, start_rect)
 
-def draw_game_over():
+def draw_game_over(world):
     """Zeichne Game Over Screen mit Statistiken"""
     draw_background()
     
     # Game Over mit Schatten
-    game_over_shadow = title_font.render("GAME OVER", True, UI_BLACK)
-    game_over_text = title_font.render("GAME OVER", True, UI_WHITE)
+    game_over_shadow = render_text(title_font, "GAME OVER", UI_BLACK)
+    game_over_text = render_text(title_font, "GAME OVER", UI_WHITE)
     game_over_rect = game_over_text.get_rect(center=(WIDTH//2, HEIGHT//3))
     game_over_bg = pygame.Rect(game_over_rect.x - 20, game_over_rect.y - 15, game_over_rect.width + 40, game_over_rect.height + 30)
     
@@ -381,252 +2146,619 @@ def draw_game_over():
     # Statistiken Box
     stats_y = HEIGHT//2 - 20  # Startpunkt der Statistiken weiter nach unten setzen
     stats = [
-        f"Final Score: {int(score)}",
-        f"Coins Collected: {coin_count}",
-        f"Best Score: {int(high_score)}"
+        f"Final Score: {int(world.score)}",
+        f"Coins Collected: {world.coin_count}",
+        f"Best Score: {int(world.high_score)}"
     ]
     
     for i, stat in enumerate(stats):
-        stat_text = font.render(stat, True, UI_BLACK)
+        stat_text = render_text(font, stat, UI_BLACK)
         stat_rect = stat_text.get_rect(center=(WIDTH//2, stats_y + i * 40))  # Abstand zwischen den Statistiken erhöhen
         stat_bg = pygame.Rect(stat_rect.x - 10, stat_rect.y - 5, stat_rect.width + 20, stat_rect.height + 10)
         pygame.draw.rect(screen, UI_WHITE, stat_bg)
         pygame.draw.rect(screen, UI_BLACK, stat_bg, 2)
         screen.blit(stat_text, stat_rect)
+    
+    # Restart Button
+    restart_text = render_text(font, "Press SPACE to Play Again", UI_BLACK)
+    restart_rect = restart_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 100))
+    restart_bg = pygame.Rect(restart_rect.x - 10, restart_rect.y - 5, restart_rect.width + 20, restart_rect.height + 10)
+    pygame.draw.rect(screen, UI_WHITE, restart_bg)
+    pygame.draw.rect(screen, UI_BLACK, restart_bg, 2)
+    screen.blit(restart_text, restart_rect)
+    
+    # Menu Button
+    menu_text = render_text(font, "Press ESC for Menu", UI_BLACK)
+    menu_rect = menu_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 150))  # Abstand erhöht (von 130 auf 150)
+    menu_bg = pygame.Rect(menu_rect.x - 10, menu_rect.y - 5, menu_rect.width + 20, menu_rect.height + 10)
+    pygame.draw.rect(screen, UI_WHITE, menu_bg)
+    pygame.draw.rect(screen, UI_BLACK, menu_bg, 2)
+    screen.blit(menu_text, menu_rect)
 
-def spawn_collectibles():
-    """Spawne Münzen und Power-Ups auf Plattformen"""
-    for platform in platforms:
-        # Überprüfe, ob bereits Münzen in der Nähe sind
-        has_nearby_coin = any(abs(coin.x - platform.rect.centerx) < 50 and abs(coin.y - platform.rect.y) < 50 for coin in coins)
-        
-        # Spawne Münzen mit einer höheren Wahrscheinlichkeit
-        if not has_nearby_coin and random.randint(1, 100) <= 5:  # 5% Chance für Münze
-            coin_x = random.randint(platform.rect.x + 10, platform.rect.right - 10)
-            coin_y = platform.rect.y - 20
-            coins.append(Coin(coin_x, coin_y))
-
-def reset_game():
-    """Spiel zurücksetzen"""
-    global player, player_vy, platforms, score, coins, power_ups, coin_count
-    global particle_effects
-    
-    player.x = WIDTH // 2 - player_width // 2
-    player_vy = 0
-    score = 0
-    coin_count = 0
-    
-    platforms.clear()
-    coins.clear()
-    power_ups.clear()
-    particle_effects.clear()
-    
-    # Startplattform (normal)
-    start_platform = Platform(WIDTH // 2 - 60, HEIGHT - 60, 120, 20, "normal")
-    platforms.append(start_platform)
-    
-    player.y = start_platform.rect.y - player.height
-    
-    # Weitere Plattformen mit verschiedenen Typen
-    for i in range(1, 8):
-        x = random.randint(0, WIDTH - 100)
-        y = HEIGHT - i * 80
-        width = random.randint(80, 120)
-        
-        # Bestimme Plattform-Typ
-        rand = random.randint(1, 10)
-        if rand <= 2:  # 20% Chance für Sprungfeder
-            platform_type = "bounce"
-        elif rand <= 3:  # 10% Chance für bewegliche Plattform
-            platform_type = "moving"
-        else:  # 70% normale Plattformen
-            platform_type = "normal"
-        
-        platforms.append(Platform(x, y, width, 20, platform_type))
-
-# Spiel initialisieren
-reset_game()
-
-# Game Loop
-running = True
-while running:
-    time_counter += 1
-    clock.tick(60)
-    
-    # Events
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                if game_state == MENU:
-                    game_state = PLAYING
-                    reset_game()
-                elif game_state == GAME_OVER:
-                    game_state = PLAYING
-                    reset_game()
-            elif event.key == pygame.K_ESCAPE:
-                if game_state == GAME_OVER:
-                    game_state = MENU
+def draw_world(world, time_counter, alpha=1.0, ghosts=()):
+    """Zeichne eine laufende Partie, alpha = Anteil zwischen letztem und nächstem Tick.
+    ghosts kommen aus RaceClient.ghosts() und liegen hinter dem Spieler."""
+    draw_background()
+    profiler.lap("draw_background")
+    draw_enhanced_platforms(world, alpha)
+    profiler.lap("draw_platforms")
+    camera = world.camera
+    camera_y = camera.render_y(alpha)
     
-    if game_state == PLAYING:
+    # Collectibles zeichnen - nur die aus dem Index, die im Sichtfenster liegen
+    top, bottom = camera_y - 20, camera_y + camera.height + 20
+    for coin in world.coin_index.query(top, bottom, world.candidates):
+        if camera.is_visible(coin.y, coin.y, margin=20, alpha=alpha):
+            coin.draw(camera_y, alpha)
+    for power_up in world.power_up_index.query(top, bottom, world.candidates):
+        y = interpolate(power_up.prev_y, power_up.y, alpha)
+        if camera.is_visible(y, y, margin=20, alpha=alpha):
+            power_up.draw(camera_y, alpha)
+    profiler.lap("draw_collectibles")
+    
+    # Partikel zeichnen
+    world.particles.draw(camera_y)
+    profiler.lap("draw_particles")
+    
+    if ghosts:
+        draw_ghosts(ghosts, camera_y, time_counter)
+        profiler.lap("draw_ghosts")
+    draw_enhanced_mario(world, time_counter, alpha)
+    profiler.lap("draw_player")
+    draw_enhanced_ui(world)
+    profiler.lap("draw_ui")
+
+PROFILER_COLORS = [(230, 25, 75), (60, 180, 75), (255, 225, 25), (0, 130, 200), (245, 130, 48),
+                   (145, 30, 180), (70, 240, 240), (240, 50, 230), (210, 245, 60), (250, 190, 190),
+                   (0, 128, 128), (170, 110, 40), (128, 0, 0), (170, 255, 195), (128, 128, 0)]
+
+def draw_profiler_overlay(meter=None):
+    """Balkendiagramm der Phasen (Mittel über 60 Frames), Skala = Frame-Budget.
+    Mit meter darunter die Allokationen des letzten Frames."""
+    averages = profiler.phase_averages()
+    if not averages:
+        return
+    
+    row = 12
+    box = pygame.Rect(WIDTH - 190, 100, 180, 24 + row * (len(averages) + (meter is not None)))
+    overlay = pygame.Surface(box.size, pygame.SRCALPHA)
+    overlay.fill((0, 0, 0, 170))
+    
+    total = sum(averages.values())
+    header = render_text(tiny_font, f"Frame {total:5.2f} ms / {FRAME_BUDGET_MS:.1f}", UI_WHITE)
+    overlay.blit(header, (6, 4))
+    
+    bar_x, bar_width = 96, box.width - 102
+    for i, (name, ms) in enumerate(averages.items()):
+        y = 20 + i * row
+        overlay.blit(render_text(tiny_font, name, UI_WHITE), (6, y))
+        length = max(1, int(bar_width * min(1.0, ms / FRAME_BUDGET_MS)))
+        pygame.draw.rect(overlay, PROFILER_COLORS[i % len(PROFILER_COLORS)], (bar_x, y + 2, length, row - 4))
+    
+    if meter is not None:
+        text = f"Alloc/Frame: {meter.entities} Entities, GC {meter.gc_objects:+d}"
+        overlay.blit(render_text(tiny_font, text, UI_WHITE), (6, 20 + len(averages) * row))
+    
+    dirty.mark(screen.blit(overlay, box))
+
+# Video-Aufnahme: so viele Frames dürfen auf den Schreib-Thread warten
+CAPTURE_QUEUE = 120
+
+class FrameRecorder:
+    """Nimmt den Bildschirm Frame für Frame auf, geschrieben wird im Hintergrund.
+    
+    capture() holt die Pixel über die Buffer-Schnittstelle der Surface (ein
+    memcpy in C, keine Pixel-Arrays in Python) und stellt sie in eine
+    begrenzte Queue. Ist sie voll, wird der Frame verworfen und gezählt -
+    die Game Loop wartet nie auf die Platte. Formate: "png" (eine Datei pro
+    Frame) oder "raw" (alle Frames hintereinander in frames.raw, Layout in
+    frames.json).
+    
+    Ändert sich das Pixel-Layout (Größe, Format, Pitch) - etwa wenn screen
+    bei F11 oder Fenstergrößen-Wechsel zwischen Fenster- und Offscreen-Surface
+    wechselt -, beginnt ein neuer Abschnitt; im Raw-Format mit eigener Datei
+    frames_<n>.raw. frames.json listet die Abschnitte mit ihrem Layout.
+    """
+    def __init__(self, directory, fmt="png", queue_size=CAPTURE_QUEUE):
+        self.directory = directory
+        self.fmt = fmt
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.frame = 0
+        self.written = 0
+        self.dropped = 0
+        self.layout = None  # (Breite, Höhe, Bits, Pitch, Masken) des aktuellen Abschnitts
+        self.segments = []
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, name="frame-writer", daemon=True)
+        self.thread.start()
+    
+    def capture(self, surface):
+        layout = (surface.get_width(), surface.get_height(), surface.get_bitsize(), surface.get_pitch(),
+                  surface.get_masks())
+        if layout != self.layout:
+            self.layout = layout
+            width, height, bitsize, pitch, masks = layout
+            number = len(self.segments)
+            self.segments.append({"file": "frames.raw" if number == 0 else f"frames_{number}.raw",
+                                  "first_frame": self.frame, "width": width, "height": height,
+                                  "bitsize": bitsize, "pitch": pitch, "masks": list(masks), "written": 0})
+        index = self.frame
+        self.frame += 1
+        if self.queue.full():
+            self.dropped += 1
+            return
+        self.queue.put_nowait((index, len(self.segments) - 1, surface.get_buffer().raw))
+    
+    def run(self):
+        raw = None
+        target = None
+        current = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            index, number, data = item
+            segment = self.segments[number]
+            if number != current:
+                # Neuer Abschnitt: eigene Raw-Datei bzw. Surface im Pixelformat einmal anlegen
+                current = number
+                if self.fmt == "raw":
+                    if raw is not None:
+                        raw.close()
+                    raw = open(os.path.join(self.directory, segment["file"]), "wb")
+                else:
+                    target = pygame.Surface((segment["width"], segment["height"]), 0,
+                                            segment["bitsize"], segment["masks"])
+            if self.fmt == "raw":
+                raw.write(data)
+            else:
+                target.get_buffer().write(data)
+                pygame.image.save(target, os.path.join(self.directory, f"frame_{index:06d}.png"))
+            segment["written"] += 1
+            self.written += 1
+        if raw is not None:
+            raw.close()
+    
+    def close(self):
+        """Restliche Frames schreiben und das Layout ablegen"""
+        self.queue.put(None)
+        self.thread.join()
+        if self.segments:
+            ends = [segment["first_frame"] for segment in self.segments[1:]] + [self.frame]
+            for segment, end in zip(self.segments, ends):
+                segment["frames"] = end - segment["first_frame"]
+                if self.fmt != "raw":
+                    del segment["file"]
+            with open(os.path.join(self.directory, "frames.json"), "w") as f:
+                json.dump({"format": self.fmt, "frames": self.frame, "written": self.written,
+                           "dropped": self.dropped, "fps": TICK_RATE, "segments": self.segments}, f, indent=2)
+        return f"{self.written} Frames nach {self.directory} geschrieben, {self.dropped} verworfen"
+
+# Qualitäts-Regler: gleitendes Fenster und Schwellen relativ zum Frame-Budget
+QUALITY_WINDOW = 90
+QUALITY_DOWN = 0.9  # darüber eine Stufe runter
+QUALITY_UP = 0.5  # darunter (lange genug) eine Stufe hoch
+QUALITY_UP_DELAY = 5.0  # Sekunden mit Reserve bis zum Hochschalten, verdoppelt sich nach Fehlversuchen
+QUALITY_UP_DELAY_MAX = 120.0
+
+def apply_quality(level, world=None):
+    """Qualitätsstufe setzen und Vorgebackenes anpassen (Plattformen und Atlas folgen beim Zeichnen)"""
+    global quality
+    quality = QUALITY_LEVELS[level]
+    if background is not None:
+        background.set_cloud_count(quality["clouds"])
+    if world is not None:
+        world.particles.limit = quality["particles"]
+    if dirty is not None:
+        dirty.mark_full()
+
+class QualityGovernor:
+    """Senkt oder hebt die Qualitätsstufe anhand der Arbeitszeit pro Frame.
+    
+    Gemessen wird ohne das Warten auf die Bildrate. Liegt der Schnitt über ein
+    volles Fenster über QUALITY_DOWN des Budgets, geht es eine Stufe runter;
+    hoch erst nach QUALITY_UP_DELAY Sekunden unter QUALITY_UP. Nach jedem
+    Wechsel beginnt das Fenster neu, und wer direkt nach dem Hochschalten
+    wieder runter muss, wartet beim nächsten Mal doppelt so lange.
+    """
+    def __init__(self, budget, level=0, enabled=True):
+        self.budget = budget
+        self.level = level
+        self.enabled = enabled
+        self.samples = deque(maxlen=QUALITY_WINDOW)
+        self.headroom_since = None
+        self.up_delay = QUALITY_UP_DELAY
+        self.just_raised = False
+        self.last_average = 0.0
+        self.time_in_level = [0.0] * len(QUALITY_LEVELS)
+    
+    def average(self):
+        return sum(self.samples) / max(1, len(self.samples))
+    
+    def update(self, work_time, frame_time, now):
+        """Frame eintragen; liefert bei einem Wechsel die neue Stufe, sonst None"""
+        self.time_in_level[self.level] += frame_time
+        if not self.enabled:
+            return None
+        self.samples.append(work_time)
+        if len(self.samples) < QUALITY_WINDOW:
+            return None
+        
+        average = self.average()
+        if average > self.budget * QUALITY_DOWN and self.level < len(QUALITY_LEVELS) - 1:
+            if self.just_raised:
+                self.up_delay = min(self.up_delay * 2, QUALITY_UP_DELAY_MAX)
+            return self.change(self.level + 1, raised=False)
+        if average < self.budget * QUALITY_UP and self.level > 0:
+            if self.headroom_since is None:
+                self.headroom_since = now
+            elif now - self.headroom_since >= self.up_delay:
+                return self.change(self.level - 1, raised=True)
+        else:
+            self.headroom_since = None
+            if average <= self.budget * QUALITY_DOWN:
+                self.just_raised = False  # die höhere Stufe hält, Fehlversuch vergessen
+        return None
+    
+    def change(self, level, raised):
+        self.last_average = self.average()
+        self.level = level
+        self.samples.clear()
+        self.headroom_since = None
+        self.just_raised = raised
+        return level
+    
+    def summary(self):
+        """Anteil der Spielzeit pro Stufe, z.B. 'hoch 92%, mittel 8%'"""
+        total = sum(self.time_in_level) or 1.0
+        return ", ".join(f"{settings['name']} {seconds / total:.0%}"
+                         for settings, seconds in zip(QUALITY_LEVELS, self.time_in_level) if seconds)
+
+class StartupTimer:
+    """Zeitmessung der Startphasen für --startup-report"""
+    def __init__(self, begin):
+        self.begin = begin
+        self.last = begin
+        self.phases = []
+    
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000.0))
+        self.last = now
+    
+    def report(self):
+        total = (self.last - self.begin) * 1000.0
+        lines = [f"Start bis erster Frame: {total:.1f} ms"]
+        for name, ms in self.phases:
+            lines.append(f"  {name:<24}{ms:8.1f} ms {ms / max(total, 1e-9):6.1%}")
+        return "\n".join(lines)
+
+startup = StartupTimer(STARTUP_BEGIN)
+
+def init_display(dirty_rects=False, seed=None, window_size=None, fullscreen=False, scale="integer"):
+    """Fenster, Fonts und vorgerenderte Grafiken anlegen.
+    Initialisiert nur Display und Font - kein Audio, Joystick usw."""
+    global presenter, screen, dirty, background, font, big_font, title_font, small_font, tiny_font
+    
+    pygame.display.init()
+    pygame.font.init()
+    startup.mark("pygame display+font")
+    presenter = Presenter(window_size, fullscreen, scale)
+    screen = presenter.surface
+    pygame.display.set_caption("DoodlePlumber")
+    startup.mark("Fenster")
+    
+    font = get_font("Arial", 20, bold=True)
+    big_font = get_font("Arial", 32, bold=True)
+    title_font = get_font("Arial", 42, bold=True)
+    small_font = get_font("Arial", 12, bold=True)
+    tiny_font = get_font("Arial", 10, bold=True)
+    startup.mark("Fonts")
+    
+    dirty = DirtyRectTracker(dirty_rects)
+    background = ParallaxBackground(seed=seed)
+    # Driftende Wolken würden jeden Frame den ganzen Bildschirm verändern
+    background.drift = not dirty.enabled
+    startup.mark("Hintergrund")
+    build_player_atlas()
+    startup.mark("Spieler-Atlas")
+
+def resize_display(toggle_fullscreen=False):
+    """Nach Größenänderung des Fensters oder Vollbild-Wechsel neu auslegen"""
+    global screen
+    if toggle_fullscreen:
+        presenter.toggle_fullscreen()
+    else:
+        presenter.layout()
+    screen = presenter.surface
+    dirty.mark_full()
+
+def parse_size(text):
+    """'BREITExHÖHE' als Tupel"""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def main(argv=None):
+    global debug_procedural_player
+    
+    # Kommandozeile
+    parser = argparse.ArgumentParser(description="DoodlePlumber")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="nur geänderte Bildschirmbereiche präsentieren (display.update statt flip)")
+    parser.add_argument("--window", type=parse_size, metavar="BREITExHÖHE",
+                        help="Fenstergröße; gezeichnet wird immer in %dx%d und dann skaliert" % (WIDTH, HEIGHT))
+    parser.add_argument("--fullscreen", action="store_true",
+                        help="Vollbild in Desktop-Auflösung (umschalten mit F11)")
+    parser.add_argument("--scale", choices=SCALE_MODES, default="integer",
+                        help="ganzzahlig mit scharfen Pixeln oder fensterfüllend geglättet")
+    parser.add_argument("--fps", type=int, default=60,
+                        help="Bildrate begrenzen (0 = unbegrenzt); die Simulation läuft immer mit %d Ticks/s" % TICK_RATE)
+    parser.add_argument("--seed", type=int,
+                        help="fester Seed für jeden Lauf (reproduzierbare Level, wird auf 0 bis 2^64-1 abgebildet)")
+    parser.add_argument("--record", metavar="DATEI",
+                        help="Eingaben jedes Laufs als Replay speichern (überschreibt beim nächsten Lauf)")
+    parser.add_argument("--replay", metavar="DATEI",
+                        help="Replay abspielen statt Tastatur-Eingaben")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Abspielgeschwindigkeit im Fenster (z.B. 4 = vierfach)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Replay ohne Fenster mit maximaler Geschwindigkeit abspielen")
+    parser.add_argument("--profile", action="store_true",
+                        help="Phasen-Profiler und Overlay von Anfang an einschalten (sonst F3)")
+    data_dir = user_data_dir()
+    parser.add_argument("--trace", metavar="DATEI", default=os.path.join(data_dir, "doodleplumber_trace.json"),
+                        help="Ziel für den Chrome-Trace-Export (F4 und beim Beenden mit --profile, Standard: %(default)s)")
+    parser.add_argument("--stats", metavar="DATEI", default=os.path.join(data_dir, "doodleplumber_stats.db"),
+                        help="SQLite-Datenbank für High-Scores und Laufstatistiken (Standard: %(default)s)")
+    parser.add_argument("--no-stats", action="store_true",
+                        help="nichts speichern, High-Score nur im Speicher")
+    parser.add_argument("--leaderboard", action="store_true",
+                        help="Bestenliste und Trend ausgeben und beenden")
+    parser.add_argument("--quality", choices=["auto"] + [settings["name"] for settings in QUALITY_LEVELS], default="auto",
+                        help="feste Qualitätsstufe oder automatisch nach Frame-Zeit regeln")
+    parser.add_argument("--capture", metavar="VERZ",
+                        help="jeden Frame im Hintergrund als Bildfolge in dieses Verzeichnis schreiben")
+    parser.add_argument("--capture-format", choices=["png", "raw"], default="png",
+                        help="PNG-Folge oder rohe Pixel in einer Datei (schneller)")
+    parser.add_argument("--capture-queue", type=int, default=CAPTURE_QUEUE,
+                        help="maximal wartende Frames, danach wird verworfen")
+    parser.add_argument("--race", metavar="HOST:PORT",
+                        help="Ghost-Rennen: eigenen Stand an diesen Server senden, andere Spieler als Ghosts zeigen")
+    parser.add_argument("--race-rate", type=int, default=20,
+                        help="Snapshots pro Sekunde an den Ghost-Server")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Zeiten der Startphasen bis zum ersten Frame ausgeben")
+    args = parser.parse_args(argv)
+    startup.mark("Import + Kommandozeile")
+    
+    if args.leaderboard:
+        store = RunStore(args.stats)
+        print_stats(store)
+        store.close()
+        return
+    
+    replay = Replay.load(args.replay) if args.replay else None
+    if args.headless:
+        if replay is None:
+            parser.error("--headless braucht --replay")
+        world = play_replay(replay)
+        print(f"Seed {replay.seed}: {world.time_counter} Ticks, Score {int(world.score)}, "
+              f"Coins {world.coin_count}, {'Game Over' if world.game_over else 'lebt noch'}")
+        return
+    
+    # Initialisierung
+    init_display(args.dirty_rects, args.seed, args.window, args.fullscreen, args.scale)
+    clock = pygame.time.Clock()
+    names = [settings["name"] for settings in QUALITY_LEVELS]
+    governor = QualityGovernor(1.0 / (args.fps or TICK_RATE), 0 if args.quality == "auto" else names.index(args.quality),
+                               enabled=args.quality == "auto")
+    apply_quality(governor.level)
+    print(f"Qualität: {quality['name']}{' (automatisch)' if governor.enabled else ''}")
+    recorder = FrameRecorder(args.capture, args.capture_format, args.capture_queue) if args.capture else None
+    meter = AllocationMeter()
+    race_client = None
+    if args.race:
+        import race
+        host, port = race.parse_address(args.race)
+        race_client = race.RaceClient(host, port, args.race_rate, snap_distance=WIDTH // 2)
+    world = None  # wird erst beim Verlassen des Menüs gebaut
+    game_state = MENU
+    time_counter = 0  # Ticks seit Start, treibt die Animationen
+    accumulator = 0.0
+    recording = None
+    
+    # Replays sind keine echten Läufe und landen nicht in der Statistik
+    store = None if args.no_stats or replay is not None else RunStore(args.stats)
+    startup.mark("Statistik-Datenbank")
+    run_frames = 0
+    run_frame_time = 0.0
+    
+    def start_run():
+        nonlocal world, recording, run_frames, run_frame_time
+        seed = replay.seed if replay is not None else args.seed
+        if world is None:
+            started = time.perf_counter()
+            world = GameWorld(seed, prefetch=True)
+            world.particles.limit = quality["particles"]
+            if store is not None:
+                world.high_score = store.high_score()
+            if args.startup_report:
+                print(f"Welt beim ersten Spielstart gebaut: {(time.perf_counter() - started) * 1000.0:.1f} ms")
+        else:
+            world.reset(seed)
+        if args.record:
+            recording = Replay(world.seed)
+        run_frames = 0
+        run_frame_time = 0.0
+    
+    def save_recording():
+        if recording is not None and len(recording):
+            recording.save(args.record)
+    
+    def save_run():
+        if store is None:
+            return
+        store.record(seed=world.seed, score=world.score, coins=world.coin_count, height=-world.camera.y,
+                     ticks=world.time_counter, duration=world.time_counter / TICK_RATE,
+                     avg_frame_ms=run_frame_time * 1000.0 / max(1, run_frames))
+    
+    # Replays starten direkt ohne Menü
+    if replay is not None:
+        game_state = PLAYING
+        start_run()
+    
+    profiler.enabled = args.profile
+    
+    # Game Loop
+    running = True
+    presented_state = None
+    first_frame = True
+    while running:
+        frame_time = min(clock.tick(args.fps) / 1000.0, MAX_FRAME_TIME)
+        frame_start = time.perf_counter()
+        accumulator += frame_time * args.speed
+        profiler.begin_frame()
+        
+        # Events
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.VIDEORESIZE:
+                resize_display()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    if game_state == MENU:
+                        game_state = PLAYING
+                        start_run()
+                    elif game_state == GAME_OVER:
+                        game_state = PLAYING
+                        start_run()
+                elif event.key == pygame.K_ESCAPE:
+                    if game_state == GAME_OVER:
+                        game_state = MENU
+                elif event.key == pygame.K_F11:
+                    resize_display(toggle_fullscreen=True)
+                elif event.key == pygame.K_F2:
+                    debug_procedural_player = not debug_procedural_player
+                elif event.key == pygame.K_F3:
+                    profiler.enabled = not profiler.enabled
+                    profiler.frames.clear()
+                    profiler.begin_frame()
+                    dirty.mark_full()
+                elif event.key == pygame.K_F4:
+                    count = profiler.export_chrome_trace(args.trace)
+                    print(f"Trace mit {count} Events nach {args.trace} geschrieben")
+        
         # Bewegung
         keys = pygame.key.get_pressed()
+        inputs = 0
         if keys[pygame.K_LEFT]:
-            player.x -= move_speed
-            player_facing_right = False
+            inputs |= INPUT_LEFT
         if keys[pygame.K_RIGHT]:
-            player.x += move_speed
-            player_facing_right = True
+            inputs |= INPUT_RIGHT
+        if keys[pygame.K_SPACE]:
+            inputs |= INPUT_SPACE
+        profiler.lap("input")
         
-        # Bildschirmgrenzen
-        if player.right < 0:
-            player.left = WIDTH
-        elif player.left > WIDTH:
-            player.right = 0
+        # Simulation in festen Ticks, unabhängig von der Bildrate
+        scrolled = 0
+        while accumulator >= TICK_TIME:
+            accumulator -= TICK_TIME
+            time_counter += 1
+            background.update()
+            profiler.lap("background_update")
+            
+            if game_state == PLAYING:
+                if replay is not None:
+                    # Aufgezeichnete Eingabe dieses Ticks, danach ist der Lauf zu Ende
+                    if world.time_counter >= len(replay):
+                        world.game_over = True
+                        game_state = GAME_OVER
+                        continue
+                    inputs = replay.inputs[world.time_counter]
+                
+                world.step(inputs)
+                scrolled += world.scroll_offset
+                if recording is not None:
+                    recording.record(inputs)
+                
+                # Game Over
+                if world.game_over:
+                    game_state = GAME_OVER
+                    save_recording()
+                    save_run()
         
-        # Plattformen aktualisieren (bewegliche Plattformen)
-        for platform in platforms:
-            platform.update(time_counter)
+        if scrolled:
+            background.scroll(scrolled)
+            dirty.mark_full()
         
-        # Physik
-        player_vy += gravity
-        player.y += player_vy
-        
-        # Plattform-Kollision
-        if player_vy > 0:
-            for platform in platforms:
-                if player.colliderect(platform.rect) and player.bottom <= platform.rect.bottom + player_vy:
-                    player.bottom = platform.rect.top
-                    
-                    if platform.type == "bounce":
-                        player_vy = jump_strength * 1.5  # Stärkerer Sprung
-                        create_jump_particles(player.centerx, player.bottom)
-                    else:
-                        player_vy = jump_strength
-                        create_jump_particles(player.centerx, player.bottom)
-        
-        # Münzen sammeln
-        for coin in coins[:]:
-            if not coin.collected:
-                coin_rect = pygame.Rect(coin.x - 15, coin.y - 15, 30, 30)
-                if player.colliderect(coin_rect):
-                    coin.collected = True
-                    coin_count += 1
-                    score += 50
-                    create_coin_particles(coin.x, coin.y)
-                    coins.remove(coin)
-                else:
-                    coin.update()
+        # Ghost-Rennen: nur den neuesten Stand ablegen, gesendet wird im Netzwerk-Thread
+        if race_client is not None and world is not None:
+            race_client.publish(world.player.x, world.player.y, world.score, world.player_facing_right, world.game_over)
         
-        # Power-Ups sammeln
-        for power_up in power_ups[:]:
-            if not power_up.collected:
-                power_rect = pygame.Rect(power_up.x - 16, power_up.y - 16, 32, 32)
-                if player.colliderect(power_rect):
-                    power_up.collected = True
-                    score += 100
-                    # Temporärer Geschwindigkeitsboost
-                    move_speed = min(8, move_speed + 1)
-                    power_ups.remove(power_up)
-                else:
-                    power_up.update()
+        if game_state == PLAYING:
+            run_frames += 1
+            run_frame_time += frame_time
+            # Zeichnen, zwischen den letzten beiden Ticks interpoliert
+            draw_world(world, time_counter, accumulator / TICK_TIME, race_client.ghosts() if race_client else ())
         
-        # Partikel aktualisieren
-        for particle in particle_effects[:]:
-            particle.update()
-            if particle.life <= 0:
-                particle_effects.remove(particle)
-        
-        # Kamera-Effekt
-        if player.y < HEIGHT // 2:
-            offset = HEIGHT // 2 - player.y
-            player.y = HEIGHT // 2
-            score += offset * 0.1
-            
-            for platform in platforms:
-                platform.rect.y += offset
-                platform.original_x = platform.rect.x  # Update für bewegliche Plattformen
-            
-            for coin in coins:
-                coin.y += offset
-            
-            for power_up in power_ups:
-                power_up.y += offset
-        
-        # Neue Plattformen
-        while len(platforms) < 12:
-            last_y = min(p.rect.y for p in platforms)
-            new_x = random.randint(0, WIDTH - 120)
-            new_y = last_y - random.randint(60, 100)
-            width = random.randint(80, 120)
-            
-            # Bestimme Plattform-Typ für neue Plattformen
-            rand = random.randint(1, 10)
-            if rand <= 2:  # 20% Chance für Sprungfeder
-                platform_type = "bounce"
-            elif rand <= 3:  # 10% Chance für bewegliche Plattform
-                platform_type = "moving"
-            else:  # 70% normale Plattformen
-                platform_type = "normal"
-            
-            platforms.append(Platform(new_x, new_y, width, 20, platform_type))
+        elif game_state == MENU:
+            draw_menu(time_counter)
+            profiler.lap("draw_menu")
         
-        # Spawne Collectibles nur gelegentlich
-        if time_counter % 60 == 0:  # Nur einmal pro Sekunde prüfen
-            spawn_collectibles()
-        
-        # Objekte entfernen die zu weit unten sind
-        platforms = [p for p in platforms if p.rect.y < HEIGHT + 50]
-        coins = [c for c in coins if c.y < HEIGHT + 100]
-        power_ups = [p for p in power_ups if p.y < HEIGHT + 100]
-             
-        # Game Over
-        if player.top > HEIGHT:
-            if score > high_score:
-                high_score = score
-            game_state = GAME_OVER
-        
-        # Zeichnen
-        draw_background()
-        draw_enhanced_platforms()
-        
-        # Collectibles zeichnen
-        for coin in coins:
-            coin.draw()
-        for power_up in power_ups:
-            power_up.draw()
-        
-        # Partikel zeichnen
-        for particle in particle_effects:
-            particle.draw()
-        
-        draw_enhanced_mario()
-        draw_enhanced_ui()
-    
-    elif game_state == MENU:
-        draw_menu()
-    
-    elif game_state == GAME_OVER:
-        draw_game_over()
-        
-        # Restart Button
-        restart_text = font.render("Press SPACE to Play Again", True, UI_BLACK)
-        restart_rect = restart_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 100))
-        restart_bg = pygame.Rect(restart_rect.x - 10, restart_rect.y - 5, restart_rect.width + 20, restart_rect.height + 10)
-        pygame.draw.rect(screen, UI_WHITE, restart_bg)
-        pygame.draw.rect(screen, UI_BLACK, restart_bg, 2)
-        screen.blit(restart_text, restart_rect)
-        
-        # Menu Button
-        menu_text = font.render("Press ESC for Menu", True, UI_BLACK)
-        menu_rect = menu_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 150))  # Abstand erhöht (von 130 auf 150)
-        menu_bg = pygame.Rect(menu_rect.x - 10, menu_rect.y - 5, menu_rect.width + 20, menu_rect.height + 10)
-        pygame.draw.rect(screen, UI_WHITE, menu_bg)
-        pygame.draw.rect(screen, UI_BLACK, menu_bg, 2)
-        screen.blit(menu_text, menu_rect)
-    
-    pygame.display.flip()
-
-pygame.quit()
-sys.exit()
\ No newline at end of file
+        elif game_state == GAME_OVER:
+            draw_game_over(world)
+            profiler.lap("draw_game_over")
+        
+        if profiler.enabled:
+            draw_profiler_overlay(meter)
+            profiler.lap("draw_overlay")
+        
+        # Zustandswechsel zeichnen den ganzen Bildschirm neu
+        if game_state != presented_state:
+            dirty.mark_full()
+            presented_state = game_state
+        dirty.present()
+        profiler.lap("present")
+        if recorder is not None:
+            recorder.capture(screen)
+            profiler.lap("capture")
+        profiler.end_frame()
+        
+        meter.sample(world)
+        now = time.perf_counter()
+        level = governor.update(now - frame_start, frame_time, now)
+        if level is not None:
+            print(f"Qualität: {quality['name']} -> {QUALITY_LEVELS[level]['name']} "
+                  f"(Schnitt {governor.last_average * 1000.0:.1f} ms von {governor.budget * 1000.0:.1f} ms)")
+            apply_quality(level, world)
+        
+        if first_frame:
+            first_frame = False
+            startup.mark("erster Frame")
+            if args.startup_report:
+                print(startup.report())
+        
+        if dirty.enabled and time_counter % TICK_RATE == 0:
+            pygame.display.set_caption(f"DoodlePlumber - Repaint {dirty.last_fraction:.0%} (avg {dirty.average_fraction():.0%})")
+    
+    if game_state == PLAYING:
+        save_recording()
+    if args.profile:
+        profiler.export_chrome_trace(args.trace)
+    if store is not None:
+        store.close()
+    print(f"Qualität: {governor.summary()}")
+    if recorder is not None:
+        print(recorder.close())
+    meter.close()
+    if race_client is not None:
+        sent, received = race_client.close()
+        print(f"Ghost-Rennen: {sent} Bytes gesendet, {received} Bytes empfangen")
+    print(f"Frames mit neu gebauten Entities: {meter.allocating_frames} von {meter.frames}, "
+          f"GC-Läufe: {meter.collections}")
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
+    sys.exit()
@@ -0,0 +1,387 @@
+"""Vektorisierte Batch-Umgebung für DoodlePlumber.
+
+Simuliert N unabhängige Partien gleichzeitig. Spieler, Plattformen und
+Münzen liegen in NumPy-Arrays der Form (N,) bzw. (N, Slots), ein step()
+rückt alle Partien mit einer Handvoll Array-Operationen um einen Tick
+weiter. Die Regeln entsprechen GameWorld.step(): gravity, jump_strength,
+Sprungfeder (1.5x), bewegliche Plattformen, horizontales Umbrechen,
+Kamera und Punkte. Die Plattformen kommen wie im Spiel aus
+generate_chunk() - Partie i spielt dasselbe Level wie GameWorld(env.seeds[i]).
+Nur Münzen würfelt BatchEnv mit eigenem Zufall, Power-Ups gibt es keine.
+    
+    env = BatchEnv(1024, seed=1)
+    obs = env.reset()
+    while True:
+        obs, reward, done = env.step(climber_actions(env))
+        env.reset(done)
+
+Aktionen sind dieselben Bitmasken wie im Spiel (INPUT_LEFT/INPUT_RIGHT).
+Mit `python batch_env.py` wird der Durchsatz gegen GameWorld gemessen.
+"""
+import argparse
+import time
+
+import numpy as np
+
+import DoodlePlumber as game
+from DoodlePlumber import WIDTH, HEIGHT, player_width, player_height, jump_strength, gravity, move_speed
+
+from DoodlePlumber import CHUNK_PLATFORMS, LEVEL_LOOKAHEAD, START_PLATFORM
+
+# Höchstens so viele Plattformen gleichzeitig: von 50 px unter dem Bild bis LEVEL_LOOKAHEAD
+# darüber plus ein ganzer Chunk, bei kleinstem Abstand (60 px) zwischen zwei Plattformen
+PLATFORM_SLOTS = (HEIGHT + 50 + LEVEL_LOOKAHEAD + CHUNK_PLATFORMS * 100) // 60 + 2
+COIN_SLOTS = 16
+PLATFORM_HEIGHT = 20
+PLATFORM_NORMAL, PLATFORM_BOUNCE, PLATFORM_MOVING = 0, 1, 2
+PLATFORM_TYPES = {"normal": PLATFORM_NORMAL, "bounce": PLATFORM_BOUNCE, "moving": PLATFORM_MOVING}
+MOVE_RANGE = 100
+
+# Beobachtung: Spieler (x, y im Bild, vy), je Plattform (dx, dy, Breite, Sprungfeder, beweglich, vorhanden),
+# nächste Münze (dx, dy, vorhanden)
+PLAYER_FEATURES = 3
+PLATFORM_FEATURES = 6
+COIN_FEATURES = 3
+OBS_SIZE = PLAYER_FEATURES + PLATFORM_SLOTS * PLATFORM_FEATURES + COIN_FEATURES
+
+def round_half_away(values):
+    """Rundung wie pygame.Rect beim Zuweisen von Kommazahlen"""
+    return np.copysign(np.floor(np.abs(values) + 0.5), values)
+
+class BatchEnv:
+    """N Partien in parallelen Arrays mit reset/step-Schnittstelle.
+    
+    Beendete Partien bleiben eingefroren (Belohnung 0), bis sie mit
+    reset(mask) neu gestartet werden. max_steps bricht endlose Läufe ab.
+    """
+    def __init__(self, num_envs, seed=None, max_steps=5000):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+        n = num_envs
+        
+        # Spieler (Oberkante links wie player.topleft)
+        self.player_x = np.zeros(n, dtype=np.int32)
+        self.player_y = np.zeros(n, dtype=np.int32)
+        self.player_vy = np.zeros(n)
+        self.facing_right = np.ones(n, dtype=bool)
+        self.camera_y = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n)
+        self.coin_count = np.zeros(n, dtype=np.int32)
+        self.steps = np.zeros(n, dtype=np.int32)
+        self.done = np.zeros(n, dtype=bool)
+        self.highest_platform_y = np.zeros(n, dtype=np.int32)
+        
+        # Level pro Partie: Seed, nächster Chunk und dessen Vorgänger-Plattform
+        self.seeds = np.zeros(n, dtype=np.uint64)
+        self.next_chunk = np.zeros(n, dtype=np.int32)
+        self.level_tail = [START_PLATFORM] * n
+        
+        # Plattformen
+        shape = (n, PLATFORM_SLOTS)
+        self.platform_x = np.zeros(shape, dtype=np.int32)
+        self.platform_y = np.zeros(shape, dtype=np.int32)
+        self.platform_width = np.zeros(shape, dtype=np.int32)
+        self.platform_type = np.zeros(shape, dtype=np.int32)
+        self.platform_origin = np.zeros(shape, dtype=np.int32)
+        self.platform_direction = np.ones(shape, dtype=np.int32)
+        self.platform_alive = np.zeros(shape, dtype=bool)
+        
+        # Münzen (Mittelpunkt)
+        shape = (n, COIN_SLOTS)
+        self.coin_x = np.zeros(shape, dtype=np.int32)
+        self.coin_y = np.zeros(shape, dtype=np.int32)
+        self.coin_alive = np.zeros(shape, dtype=bool)
+        
+        self.reset()
+    
+    def reset(self, mask=None, seeds=None):
+        """Partien neu starten (alle oder nur die in mask) und Beobachtungen liefern.
+        Mit mask werden nur bei mindestens einem Neustart neue Beobachtungen berechnet, sonst None.
+        seeds legt die Level der neu gestarteten Partien fest, sonst werden sie gewürfelt."""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        envs = np.flatnonzero(mask)
+        count = len(envs)
+        if count:
+            rng = self.rng
+            self.player_x[envs] = WIDTH // 2 - player_width // 2
+            self.player_y[envs] = HEIGHT - 60 - player_height
+            self.player_vy[envs] = 0
+            self.facing_right[envs] = True
+            self.camera_y[envs] = 0
+            self.score[envs] = 0
+            self.coin_count[envs] = 0
+            self.steps[envs] = 0
+            self.done[envs] = False
+            self.coin_alive[envs] = False
+            
+            # Startplattform, darüber die ersten Chunks wie in GameWorld.reset()
+            self.seeds[envs] = rng.integers(0, game.SEED_RANGE, size=count, dtype=np.uint64) if seeds is None else seeds
+            self.next_chunk[envs] = 0
+            for env in envs.tolist():
+                self.level_tail[env] = START_PLATFORM
+            x, y, width, platform_type = START_PLATFORM
+            self.platform_alive[envs] = False
+            self.platform_direction[envs] = 1
+            self.platform_x[envs, 0] = x
+            self.platform_origin[envs, 0] = x
+            self.platform_y[envs, 0] = y
+            self.platform_width[envs, 0] = width
+            self.platform_type[envs, 0] = PLATFORM_TYPES[platform_type]
+            self.platform_alive[envs, 0] = True
+            self.highest_platform_y[envs] = y
+            self.load_chunks(envs)
+        elif mask is not None:
+            return None
+        return self.observe()
+    
+    def step(self, actions):
+        """Alle laufenden Partien um einen Tick weiterrechnen.
+        
+        actions: Bitmasken (INPUT_LEFT/INPUT_RIGHT) pro Partie.
+        Liefert (Beobachtungen, Belohnung = Punktzuwachs, done).
+        """
+        actions = np.asarray(actions)
+        active = ~self.done
+        score_before = self.score.copy()
+        self.steps += active
+        
+        # Bewegung und horizontales Umbrechen
+        left = active & ((actions & game.INPUT_LEFT) != 0)
+        right = active & ((actions & game.INPUT_RIGHT) != 0)
+        self.player_x += move_speed * (right.astype(np.int32) - left)
+        self.facing_right = np.where(right, True, np.where(left, False, self.facing_right))
+        px = self.player_x
+        px[px + player_width < 0] = WIDTH
+        px[px > WIDTH] = -player_width
+        
+        # Bewegliche Plattformen
+        moving = (self.platform_type == PLATFORM_MOVING) & active[:, None]
+        self.platform_x += np.where(moving, self.platform_direction, 0)
+        offset = self.platform_x - self.platform_origin
+        flip = moving & ((offset > MOVE_RANGE) | (offset < -MOVE_RANGE))
+        self.platform_direction[flip] *= -1
+        
+        # Physik
+        prev_bottom = self.player_y + player_height
+        self.player_vy = np.where(active, self.player_vy + gravity, self.player_vy)
+        self.player_y = np.where(active, round_half_away(self.player_y + self.player_vy).astype(np.int32), self.player_y)
+        self.collide(active, prev_bottom)
+        self.collect_coins(active)
+        
+        # Kamera folgt nach oben, Höhengewinn gibt Punkte
+        top = self.player_y - HEIGHT // 2
+        scroll = np.where(active & (top < self.camera_y), self.camera_y - top, 0)
+        self.camera_y -= scroll
+        self.score += scroll * 0.1
+        
+        loading = np.flatnonzero(active & (self.highest_platform_y > self.camera_y - LEVEL_LOOKAHEAD))
+        if len(loading):
+            self.load_chunks(loading)
+        spawn = active & (self.steps % 60 == 0)
+        if spawn.any():
+            self.spawn_coins(spawn)
+        
+        # Nur nach dem Scrollen aussortieren, wie in GameWorld
+        bottom = self.camera_y + HEIGHT
+        scrolled = (scroll != 0)[:, None]
+        self.platform_alive &= ~(scrolled & (self.platform_y >= bottom[:, None] + 50))
+        self.coin_alive &= ~(scrolled & (self.coin_y >= bottom[:, None] + 100))
+        
+        self.done |= active & ((self.player_y > bottom) | (self.steps >= self.max_steps))
+        return self.observe(), self.score - score_before, self.done.copy()
+    
+    def collide(self, active, prev_bottom):
+        """Landung beim Fallen als Swept-Test wie lands_on(); bei mehreren Treffern zählt die höchste Plattform"""
+        falling = active & (self.player_vy > 0)
+        px = self.player_x[:, None]
+        py = self.player_y[:, None]
+        hit = (falling[:, None] & self.platform_alive
+               & (px < self.platform_x + self.platform_width) & (px + player_width > self.platform_x)
+               & (prev_bottom[:, None] <= self.platform_y + PLATFORM_HEIGHT) & (py + player_height > self.platform_y))
+        landed = hit.any(axis=1)
+        if not landed.any():
+            return
+        tops = np.where(hit, self.platform_y, np.iinfo(np.int32).max)
+        slot = tops.argmin(axis=1)
+        envs = np.flatnonzero(landed)
+        slot = slot[envs]
+        self.player_y[envs] = self.platform_y[envs, slot] - player_height
+        bounce = self.platform_type[envs, slot] == PLATFORM_BOUNCE
+        self.player_vy[envs] = np.where(bounce, jump_strength * 1.5, jump_strength)
+    
+    def collect_coins(self, active):
+        px = self.player_x[:, None]
+        py = self.player_y[:, None]
+        hit = (active[:, None] & self.coin_alive
+               & (px < self.coin_x + 15) & (px + player_width > self.coin_x - 15)
+               & (py < self.coin_y + 15) & (py + player_height > self.coin_y - 15))
+        collected = hit.sum(axis=1)
+        self.coin_alive &= ~hit
+        self.coin_count += collected
+        self.score += 50 * collected
+    
+    def load_chunks(self, envs):
+        """Chunks laden wie GameWorld.load_chunks(), bis über der Kamera genug Plattformen stehen.
+        Nur für die Partien in envs - das passiert selten, daher als Schleife in Python."""
+        for env in envs.tolist():
+            seed = int(self.seeds[env])
+            while self.highest_platform_y[env] > self.camera_y[env] - LEVEL_LOOKAHEAD:
+                chunk = game.generate_chunk(seed, int(self.next_chunk[env]), self.level_tail[env])
+                slots = np.flatnonzero(~self.platform_alive[env])[:len(chunk)]
+                if len(slots) < len(chunk):
+                    raise RuntimeError("PLATFORM_SLOTS reicht nicht für Partie %d" % env)
+                x, y, width, platform_type = zip(*chunk)
+                self.platform_x[env, slots] = x
+                self.platform_origin[env, slots] = x
+                self.platform_y[env, slots] = y
+                self.platform_width[env, slots] = width
+                self.platform_type[env, slots] = [PLATFORM_TYPES[t] for t in platform_type]
+                self.platform_direction[env, slots] = 1
+                self.platform_alive[env, slots] = True
+                self.highest_platform_y[env] = min(self.highest_platform_y[env], min(y))
+                self.level_tail[env] = chunk[-1]
+                self.next_chunk[env] += 1
+    
+    def spawn_coins(self, spawn):
+        """5% Chance pro Plattform ohne Münze in der Nähe, wie spawn_collectibles()"""
+        rng = self.rng
+        for slot in range(PLATFORM_SLOTS):
+            center = self.platform_x[:, slot] + self.platform_width[:, slot] // 2
+            top = self.platform_y[:, slot]
+            nearby = (self.coin_alive & (np.abs(self.coin_x - center[:, None]) < 50)
+                      & (np.abs(self.coin_y - top[:, None]) < 50)).any(axis=1)
+            chance = rng.integers(1, 101, size=self.num_envs) <= 5
+            free = ~self.coin_alive
+            envs = np.flatnonzero(spawn & self.platform_alive[:, slot] & ~nearby & chance & free.any(axis=1))
+            if not len(envs):
+                continue
+            coin_slot = free[envs].argmax(axis=1)
+            low = self.platform_x[envs, slot] + 10
+            high = self.platform_x[envs, slot] + self.platform_width[envs, slot] - 10
+            self.coin_x[envs, coin_slot] = rng.integers(low, high + 1)
+            self.coin_y[envs, coin_slot] = top[envs] - 20
+            self.coin_alive[envs, coin_slot] = True
+    
+    def observe(self):
+        """Beobachtungen (N, OBS_SIZE), Abstände relativ zum Spieler und normiert.
+        Plattformen sind von unten nach oben sortiert, fehlende Slots sind 0."""
+        n = self.num_envs
+        obs = np.zeros((n, OBS_SIZE), dtype=np.float32)
+        obs[:, 0] = self.player_x / WIDTH
+        obs[:, 1] = (self.player_y - self.camera_y) / HEIGHT
+        obs[:, 2] = self.player_vy / -jump_strength
+        
+        # Sortierreihenfolge einmal als flacher Index, np.take ist deutlich schneller als Fancy-Indexing
+        order = np.argsort(np.where(self.platform_alive, -self.platform_y, np.iinfo(np.int32).max), axis=1)
+        flat = (order + np.arange(0, n * PLATFORM_SLOTS, PLATFORM_SLOTS)[:, None]).ravel()
+        def gather(values):
+            return np.take(values, flat).reshape(n, PLATFORM_SLOTS)
+        alive = gather(self.platform_alive)
+        platform_type = gather(self.platform_type)
+        end = PLAYER_FEATURES + PLATFORM_SLOTS * PLATFORM_FEATURES
+        features = np.empty((n, PLATFORM_SLOTS, PLATFORM_FEATURES), dtype=np.float32)
+        features[:, :, 0] = gather(self.platform_x) - self.player_x[:, None]
+        features[:, :, 0] *= 1.0 / WIDTH
+        features[:, :, 1] = gather(self.platform_y) - self.player_y[:, None]
+        features[:, :, 1] *= 1.0 / HEIGHT
+        features[:, :, 2] = gather(self.platform_width)
+        features[:, :, 2] *= 1.0 / WIDTH
+        features[:, :, 3] = platform_type == PLATFORM_BOUNCE
+        features[:, :, 4] = platform_type == PLATFORM_MOVING
+        features[:, :, 5] = alive
+        features *= alive[:, :, None]
+        obs[:, PLAYER_FEATURES:end] = features.reshape(n, -1)
+        
+        dx = self.coin_x - (self.player_x + player_width // 2)[:, None]
+        dy = self.coin_y - (self.player_y + player_height // 2)[:, None]
+        distance = np.where(self.coin_alive, dx * dx + dy * dy, np.iinfo(np.int32).max)
+        nearest = distance.argmin(axis=1)[:, None]
+        has_coin = np.take_along_axis(self.coin_alive, nearest, axis=1)[:, 0]
+        obs[:, end] = np.take_along_axis(dx, nearest, axis=1)[:, 0] / WIDTH * has_coin
+        obs[:, end + 1] = np.take_along_axis(dy, nearest, axis=1)[:, 0] / HEIGHT * has_coin
+        obs[:, end + 2] = has_coin
+        return obs
+
+def climber_actions(env):
+    """climber_inputs() für alle Partien: auf die nächste Plattform über dem Spieler zusteuern"""
+    bottom = (env.player_y + player_height)[:, None]
+    candidates = env.platform_alive & (env.platform_y < bottom) & (env.platform_y >= bottom - 160)
+    tops = np.where(candidates, env.platform_y, np.iinfo(np.int32).min)
+    slot = tops.argmax(axis=1)[:, None]
+    has_target = candidates.any(axis=1)
+    target_center = (np.take_along_axis(env.platform_x, slot, axis=1)
+                     + np.take_along_axis(env.platform_width, slot, axis=1) // 2)[:, 0]
+    player_center = env.player_x + player_width // 2
+    actions = np.where(target_center < player_center - 8, game.INPUT_LEFT,
+                       np.where(target_center > player_center + 8, game.INPUT_RIGHT, 0))
+    return np.where(has_target, actions, 0)
+
+def seed_rounds(size):
+    """Level-Seeds in Runden zu je size Stück - beide Messungen spielen dieselben Level"""
+    rng = np.random.default_rng(0)
+    while True:
+        yield rng.integers(0, game.SEED_RANGE, size=size, dtype=np.uint64)
+
+def measure_game(seconds, max_steps, rounds):
+    """Episoden und Ticks pro Sekunde mit GameWorld und climber_inputs(); jede Episode läuft ganz durch"""
+    world = game.GameWorld(0)
+    episodes = steps = 0
+    start = time.perf_counter()
+    seeds = iter(())
+    while time.perf_counter() - start < seconds:
+        seed = next(seeds, None)
+        if seed is None:
+            seeds = iter(next(rounds).tolist())
+            seed = next(seeds)
+        world.reset(seed)
+        for _ in range(max_steps):
+            world.step(game.climber_inputs(world))
+            steps += 1
+            if world.game_over:
+                break
+        episodes += 1
+    elapsed = time.perf_counter() - start
+    return episodes / elapsed, steps / elapsed
+
+def measure_batch(num_envs, seconds, max_steps, rounds):
+    """Episoden und Ticks pro Sekunde mit BatchEnv und climber_actions().
+    
+    Gezählt werden nur ganze Runden: alle Partien starten gemeinsam und die
+    Runde endet erst, wenn die letzte fertig ist - Episoden, die bei Ablauf
+    der Zeit noch laufen, fallen so nicht unter den Tisch, und die Wartezeit
+    auf Nachzügler geht mit in die Messung ein.
+    """
+    env = BatchEnv(num_envs, seed=0, max_steps=max_steps)
+    episodes = steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        env.reset(seeds=next(rounds))
+        while not env.done.all():
+            steps += int((~env.done).sum())
+            env.step(climber_actions(env))
+        episodes += num_envs
+    elapsed = time.perf_counter() - start
+    return episodes / elapsed, steps / elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Durchsatz BatchEnv gegen GameWorld")
+    parser.add_argument("--envs", type=int, default=1024, help="Anzahl paralleler Partien")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Messdauer pro Variante")
+    parser.add_argument("--max-steps", type=int, default=600, help="Abbruch pro Episode in Ticks")
+    args = parser.parse_args(argv)
+    
+    # Beide Varianten spielen dieselben Level in derselben Reihenfolge
+    headless, headless_steps = measure_game(args.seconds, args.max_steps, seed_rounds(args.envs))
+    batch, batch_steps = measure_batch(args.envs, args.seconds, args.max_steps, seed_rounds(args.envs))
+    print(f"{'Variante':<22}{'Ticks/s':>14}{'Episoden/s':>12}")
+    print(f"{'Spiel (60 FPS)':<22}{game.TICK_RATE:>14}{'':>12}")
+    print(f"{'GameWorld headless':<22}{headless_steps:>14.0f}{headless:>12.1f}")
+    print(f"{f'BatchEnv ({args.envs})':<22}{batch_steps:>14.0f}{batch:>12.1f}")
+    print(f"Faktor Ticks/s gegen Spiel {batch_steps / game.TICK_RATE:.0f}x, "
+          f"gegen GameWorld headless {batch_steps / headless_steps:.1f}x "
+          f"(Episoden/s {batch / headless:.1f}x, jede Episode ganz gespielt)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Benchmark-Suite für DoodlePlumber.
+
+Jedes Szenario läuft eine feste Anzahl Frames mit festem Seed und
+geskripteten Eingaben, misst Update, Zeichnen und Präsentieren (inklusive
+Skalierung auf --resolution) getrennt und meldet p50/p95/p99 der
+Frame-Zeiten. Die Ergebnisse landen als JSON in einer
+Datei, damit sich Commits vergleichen lassen:
+    
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform as platform_info
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import DoodlePlumber as game
+
+def percentiles(samples):
+    """Kennzahlen einer Messreihe in Millisekunden"""
+    data = np.asarray(samples) * 1000.0
+    return {
+        "p50": round(float(np.percentile(data, 50)), 4),
+        "p95": round(float(np.percentile(data, 95)), 4),
+        "p99": round(float(np.percentile(data, 99)), 4),
+        "mean": round(float(data.mean()), 4),
+        "max": round(float(data.max()), 4),
+    }
+
+def rss_kb():
+    """Aktueller Speicherverbrauch des Prozesses (nur Linux, sonst 0)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return 0
+
+class Scenario:
+    """Basis: update() simuliert einen Tick, draw() zeichnet ihn, present() bringt ihn ins Fenster"""
+    name = None
+    frames = 600
+    
+    def __init__(self, seed):
+        self.seed = seed
+        self.tick = 0
+        self.world = game.GameWorld(seed)
+    
+    def inputs(self):
+        return game.climber_inputs(self.world)
+    
+    def update(self):
+        self.tick += 1
+        game.background.update()
+        self.world.step(self.inputs())
+        if self.world.scroll_offset:
+            game.background.scroll(self.world.scroll_offset)
+        if self.world.game_over:
+            self.world.reset(self.seed)
+    
+    def draw(self):
+        game.draw_world(self.world, self.tick)
+    
+    def present(self):
+        game.dirty.present()
+    
+    def extra(self):
+        return {}
+
+class MenuScenario(Scenario):
+    """Leerlauf im Startmenü (draw_menu)"""
+    name = "menu"
+    
+    def update(self):
+        self.tick += 1
+        game.background.update()
+    
+    def draw(self):
+        game.draw_menu(self.tick)
+
+class PlayScenario(Scenario):
+    """Normales Spiel mit dem Kletter-Bot"""
+    name = "play"
+
+class ParticleScenario(Scenario):
+    """Große Partikel-Explosionen in jedem Tick"""
+    name = "particles"
+    burst = 2000
+    
+    def update(self):
+        super().update()
+        player = self.world.player
+        self.world.create_jump_particles(player.centerx, player.bottom, count=self.burst)
+    
+    def extra(self):
+        return {"live_particles": len(self.world.particles), "dropped_particles": self.world.particles.dropped}
+
+class CoinScenario(Scenario):
+    """Bildschirm voller Münzen, werden nachgefüllt sobald eingesammelt"""
+    name = "coins"
+    spacing = 30
+    
+    def fill(self):
+        world = self.world
+        top = world.camera.y
+        present = {(coin.x, coin.y) for coin in world.coins}
+        for y in range(top + 20, top + game.HEIGHT - 20, self.spacing):
+            for x in range(15, game.WIDTH - 15, self.spacing):
+                if (x, y) not in present:
+                    world.add_coin(game.Coin(x, y))
+    
+    def update(self):
+        super().update()
+        if self.tick % game.TICK_RATE == 1:
+            self.fill()
+    
+    def extra(self):
+        return {"coins": len(self.world.coins)}
+
+class PlatformScenario(Scenario):
+    """Hunderte Plattformen gleichzeitig im und über dem Sichtfenster"""
+    name = "platforms"
+    count = 400
+    
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.rng = np.random.default_rng(seed)
+        self.populate()
+    
+    def populate(self):
+        """Auf `count` Plattformen auffüllen, verteilt über zwei Bildschirmhöhen"""
+        world = self.world
+        rng = self.rng
+        for _ in range(self.count - len(world.platforms)):
+            x = int(rng.integers(0, game.WIDTH - 80))
+            y = int(world.camera.y + rng.integers(-game.HEIGHT, game.HEIGHT))
+            width = int(rng.integers(80, 121))
+            platform_type = ("normal", "bounce", "moving")[int(rng.integers(0, 3))]
+            world.add_platform(game.Platform(x, y, width, 20, platform_type))
+    
+    def update(self):
+        super().update()
+        self.populate()
+    
+    def extra(self):
+        return {"platforms": len(self.world.platforms)}
+
+class LongRunScenario(Scenario):
+    """Langer Lauf zur Leck-Erkennung: Speicher und Objektanzahl am Anfang und Ende"""
+    name = "long_run"
+    frames = 20000
+    
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.samples = []
+    
+    def update(self):
+        super().update()
+        if self.tick % 2000 == 0:
+            gc.collect()
+            self.samples.append((self.tick, rss_kb(), len(gc.get_objects()), self.world.entity_allocations()))
+    
+    def extra(self):
+        if len(self.samples) < 2:
+            return {}
+        # Erstes Sample gilt als aufgewärmt, danach sollte nichts mehr wachsen
+        first, last = self.samples[0], self.samples[-1]
+        return {
+            "rss_growth_kb": last[1] - first[1],
+            "gc_object_growth": last[2] - first[2],
+            "entity_allocation_growth": last[3] - first[3],
+            "samples": self.samples,
+        }
+
+class SnapshotScenario(Scenario):
+    """Wie eine Such-KI: jeden Tick Snapshot ziehen, vorausspielen und zurückspulen"""
+    name = "snapshot"
+    lookahead = 30
+    
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.snapshot_times = []
+        self.restore_times = []
+        self.size = 0
+    
+    def update(self):
+        world = self.world
+        start = time.perf_counter()
+        snapshot = world.snapshot()
+        taken = time.perf_counter()
+        world.step(game.climber_inputs(world), self.lookahead)
+        restore_start = time.perf_counter()
+        world.restore(snapshot)
+        end = time.perf_counter()
+        self.snapshot_times.append(taken - start)
+        self.restore_times.append(end - restore_start)
+        self.size = len(snapshot.to_bytes())
+        super().update()
+    
+    def extra(self):
+        return {"snapshot_ms": percentiles(self.snapshot_times), "restore_ms": percentiles(self.restore_times),
+                "snapshot_bytes": self.size}
+
+SCENARIOS = [MenuScenario, PlayScenario, ParticleScenario, CoinScenario, PlatformScenario, LongRunScenario,
+             SnapshotScenario]
+
+def run_scenario(scenario_class, seed, frames=None):
+    scenario = scenario_class(seed)
+    frames = frames or scenario_class.frames
+    update_times = []
+    draw_times = []
+    present_times = []
+    
+    gc.collect()
+    for _ in range(frames):
+        start = time.perf_counter()
+        scenario.update()
+        updated = time.perf_counter()
+        scenario.draw()
+        drawn = time.perf_counter()
+        scenario.present()
+        end = time.perf_counter()
+        update_times.append(updated - start)
+        draw_times.append(drawn - updated)
+        present_times.append(end - drawn)
+    
+    frame_times = np.add(np.add(update_times, draw_times), present_times)
+    result = {
+        "frames": frames,
+        "update_ms": percentiles(update_times),
+        "draw_ms": percentiles(draw_times),
+        "present_ms": percentiles(present_times),
+        "frame_ms": percentiles(frame_times),
+    }
+    result.update(scenario.extra())
+    return result
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, baseline=None):
+    print(f"{'Szenario':<12}{'update p50':>12}{'draw p50':>10}{'present p50':>13}{'frame p50':>11}{'p95':>9}{'p99':>9}")
+    for name, result in results["scenarios"].items():
+        frame = result["frame_ms"]
+        present = result.get("present_ms", {}).get("p50", 0.0)  # ältere Ergebnisse ohne eigene Spalte
+        line = (f"{name:<12}{result['update_ms']['p50']:>12.3f}{result['draw_ms']['p50']:>10.3f}{present:>13.3f}"
+                f"{frame['p50']:>11.3f}{frame['p95']:>9.3f}{frame['p99']:>9.3f}")
+        if baseline and name in baseline.get("scenarios", {}):
+            old = baseline["scenarios"][name]["frame_ms"]["p95"]
+            if old:
+                line += f"   p95 {(frame['p95'] - old) / old:+.1%}"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DoodlePlumber Benchmark-Suite")
+    parser.add_argument("--scenario", action="append", choices=[s.name for s in SCENARIOS],
+                        help="nur diese Szenarien (mehrfach möglich)")
+    parser.add_argument("--frames", type=int, help="Frames pro Szenario überschreiben")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", metavar="DATEI", help="Ergebnisse als JSON speichern")
+    parser.add_argument("--compare", metavar="DATEI", help="mit früherem JSON-Ergebnis vergleichen")
+    parser.add_argument("--window", action="store_true",
+                        help="echtes Fenster statt SDL-Dummy-Treiber verwenden")
+    parser.add_argument("--resolution", type=game.parse_size, metavar="BREITExHÖHE",
+                        help="Ausgabegröße, auf die präsentiert wird (gezeichnet wird immer logisch)")
+    parser.add_argument("--scale", choices=game.SCALE_MODES, default="integer")
+    args = parser.parse_args(argv)
+    
+    if not args.window:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    game.init_display(seed=args.seed, window_size=args.resolution, scale=args.scale)
+    import pygame
+    
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "platform": platform_info.platform(),
+            "video_driver": pygame.display.get_driver(),
+            "resolution": pygame.display.get_surface().get_size(),
+            "scale": args.scale,
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+    selected = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    for scenario_class in selected:
+        results["scenarios"][scenario_class.name] = run_scenario(scenario_class, args.seed, args.frames)
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""Ghost-Rennen: andere Live-Spieler als Geister mitspielen lassen.
+
+Ein asyncio-Server sammelt von jedem Client dessen Stand (Position, Punkte,
+Blickrichtung) und verteilt alle Stände mit fester Rate an alle Clients.
+Über die Leitung gehen nur Deltas zum zuletzt gesendeten Stand als Varints,
+ein laufender Spieler kostet so nur wenige Bytes pro Snapshot:
+    
+    python race.py serve --port 8765
+    python DoodlePlumber.py --race 127.0.0.1:8765
+    python race.py bots --count 200   # Last-Test mit headless Bots
+
+Nachrichten sind mit ihrer Länge (Varint) gerahmt, das erste Byte ist der
+Typ. Der Server kodiert jeden Broadcast nur einmal und schickt dieselben
+Bytes an alle Clients. Wer mit dem Lesen nicht hinterherkommt, bekommt keine
+Deltas mehr, sondern einen Keyframe, sobald sein Sendepuffer leer ist.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from collections import deque
+
+DEFAULT_PORT = 8765
+DEFAULT_RATE = 20  # Snapshots pro Sekunde
+MAX_BUFFERED = 64 * 1024  # Sendepuffer pro Client, darüber wird auf Keyframe umgestellt
+MAX_CLIENT_MESSAGE = 64  # Client-Nachrichten sind nur ein Stand
+RECONNECT_DELAY = 2.0
+STATS_INTERVAL = 5.0
+TRACK_LENGTH = 16  # empfangene Stände pro Ghost für die Interpolation
+
+# Nachrichtentypen
+MSG_STATE = 1  # Client -> Server: eigener Stand als Delta
+MSG_WELCOME = 2  # Server -> Client: Spieler-ID und Broadcast-Rate
+MSG_KEYFRAME = 3  # Server -> Client: alle Spieler als Delta zu EMPTY_STATE
+MSG_DELTA = 4  # Server -> Client: geänderte und gegangene Spieler
+
+# Felder eines Deltas (Bitmaske)
+FIELD_X = 1
+FIELD_Y = 2
+FIELD_SCORE = 4
+FIELD_FLAGS = 8
+FIELD_LEFT = 16  # Spieler hat das Rennen verlassen
+
+# Flags im Stand
+FLAG_FACING_RIGHT = 1
+FLAG_GAME_OVER = 2
+
+# Stand eines Spielers: (x, y, score, flags) in Weltkoordinaten, neue Spieler starten hier
+EMPTY_STATE = (0, 0, 0, 0)
+
+def make_state(x, y, score, facing_right, game_over=False):
+    flags = (FLAG_FACING_RIGHT if facing_right else 0) | (FLAG_GAME_OVER if game_over else 0)
+    return (int(x), int(y), int(score), flags)
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, pos):
+    """Wert und neue Position; IndexError, wenn die Daten vorher enden"""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def write_signed(out, value):
+    """Zickzack-Kodierung: kleine Beträge werden kurz, egal mit welchem Vorzeichen"""
+    write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+def read_signed(data, pos):
+    value, pos = read_varint(data, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+def encode_delta(out, old, new):
+    """Stand new als Delta zu old anhängen: Maske, danach nur die geänderten Felder"""
+    mask = 0
+    if new[0] != old[0]:
+        mask |= FIELD_X
+    if new[1] != old[1]:
+        mask |= FIELD_Y
+    if new[2] != old[2]:
+        mask |= FIELD_SCORE
+    if new[3] != old[3]:
+        mask |= FIELD_FLAGS
+    out.append(mask)
+    if mask & FIELD_X:
+        write_signed(out, new[0] - old[0])
+    if mask & FIELD_Y:
+        write_signed(out, new[1] - old[1])
+    if mask & FIELD_SCORE:
+        write_signed(out, new[2] - old[2])
+    if mask & FIELD_FLAGS:
+        out.append(new[3])
+
+def decode_delta(data, pos, old):
+    """Gegenstück zu encode_delta; liefert None als Stand, wenn der Spieler gegangen ist"""
+    mask = data[pos]
+    pos += 1
+    if mask & FIELD_LEFT:
+        return None, pos
+    x, y, score, flags = old
+    if mask & FIELD_X:
+        dx, pos = read_signed(data, pos)
+        x += dx
+    if mask & FIELD_Y:
+        dy, pos = read_signed(data, pos)
+        y += dy
+    if mask & FIELD_SCORE:
+        dscore, pos = read_signed(data, pos)
+        score += dscore
+    if mask & FIELD_FLAGS:
+        flags = data[pos]
+        pos += 1
+    return (x, y, score, flags), pos
+
+def frame(body):
+    """Nachricht mit vorangestellter Länge"""
+    out = bytearray()
+    write_varint(out, len(body))
+    out += body
+    return bytes(out)
+
+class FrameReader:
+    """Sammelt empfangene Bytes und liefert vollständige Nachrichten"""
+    def __init__(self, max_size=None):
+        self.buffer = bytearray()
+        self.max_size = max_size
+    
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        messages = []
+        pos = 0
+        while pos < len(buffer):
+            try:
+                length, start = read_varint(buffer, pos)
+            except IndexError:
+                break  # Länge selbst noch unvollständig
+            if self.max_size is not None and length > self.max_size:
+                raise ValueError("Nachricht zu lang: %d Bytes" % length)
+            if start + length > len(buffer):
+                break
+            messages.append(bytes(buffer[start:start + length]))
+            pos = start + length
+        del buffer[:pos]
+        return messages
+
+class ServerConnection(asyncio.Protocol):
+    """Ein Client auf dem Server"""
+    def __init__(self, server):
+        self.server = server
+        self.reader = FrameReader(MAX_CLIENT_MESSAGE)
+        self.transport = None
+        self.player_id = None
+        self.keyframe = True  # braucht vor dem nächsten Delta den kompletten Stand
+    
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.join(self)
+    
+    def data_received(self, data):
+        self.server.bytes_in += len(data)
+        try:
+            for message in self.reader.feed(data):
+                if message[0] == MSG_STATE:
+                    self.server.update(self.player_id, message)
+        except (IndexError, ValueError):
+            self.transport.close()  # kaputte Daten: Verbindung trennen
+    
+    def connection_lost(self, exc):
+        self.server.leave(self)
+    
+    def send(self, data):
+        self.server.bytes_out += len(data)
+        self.transport.write(data)
+    
+    def backlogged(self):
+        return self.transport.get_write_buffer_size() > MAX_BUFFERED
+
+class RaceServer:
+    """Sammelt die Stände aller Clients und verteilt sie mit `rate` Broadcasts pro Sekunde.
+    
+    Pro Broadcast wird ein Delta gegen den Stand des vorigen Broadcasts gebaut
+    und an alle gesendet - der Aufwand pro Client ist ein transport.write().
+    """
+    def __init__(self, rate=DEFAULT_RATE):
+        self.rate = rate
+        self.tick = 0
+        self.next_id = 1
+        self.connections = {}  # Spieler-ID -> ServerConnection
+        self.states = {}  # Spieler-ID -> aktueller Stand, erst ab dem ersten MSG_STATE
+        self.sent = {}  # Spieler-ID -> Stand im letzten Broadcast (Basis der Deltas)
+        self.left = []  # seit dem letzten Broadcast gegangen
+        self.bytes_in = 0
+        self.bytes_out = 0
+    
+    def join(self, connection):
+        player_id = self.next_id
+        self.next_id += 1
+        connection.player_id = player_id
+        self.connections[player_id] = connection
+        body = bytearray((MSG_WELCOME,))
+        write_varint(body, player_id)
+        write_varint(body, self.rate)
+        connection.send(frame(body))
+    
+    def leave(self, connection):
+        player_id = connection.player_id
+        self.connections.pop(player_id, None)
+        self.states.pop(player_id, None)
+        if player_id in self.sent:
+            self.left.append(player_id)
+    
+    def update(self, player_id, message):
+        # Erst mit dem ersten Stand kommt der Spieler in states und damit in die Broadcasts,
+        # sonst stünde er bis dahin bei allen als Ghost auf (0, 0)
+        state, _ = decode_delta(message, 1, self.states.get(player_id, EMPTY_STATE))
+        if state is not None:
+            self.states[player_id] = state
+    
+    def encode(self, kind, entries, count):
+        body = bytearray((kind,))
+        write_varint(body, self.tick)
+        write_varint(body, count)
+        body += entries
+        return frame(body)
+    
+    def keyframe(self):
+        entries = bytearray()
+        for player_id, state in self.sent.items():
+            write_varint(entries, player_id)
+            encode_delta(entries, EMPTY_STATE, state)
+        return self.encode(MSG_KEYFRAME, entries, len(self.sent))
+    
+    def broadcast(self):
+        """Ein Broadcast: Delta bauen, an alle senden, Nachzügler bekommen Keyframes"""
+        self.tick += 1
+        entries = bytearray()
+        count = 0
+        for player_id in self.left:
+            write_varint(entries, player_id)
+            entries.append(FIELD_LEFT)
+            self.sent.pop(player_id, None)
+            count += 1
+        self.left.clear()
+        for player_id, state in self.states.items():
+            old = self.sent.get(player_id)
+            if state != old:
+                write_varint(entries, player_id)
+                encode_delta(entries, old or EMPTY_STATE, state)
+                self.sent[player_id] = state
+                count += 1
+        
+        delta = self.encode(MSG_DELTA, entries, count) if count else None
+        keyframe = None
+        for connection in self.connections.values():
+            if connection.backlogged():
+                connection.keyframe = True
+            elif connection.keyframe:
+                if keyframe is None:
+                    keyframe = self.keyframe()
+                connection.send(keyframe)
+                connection.keyframe = False
+            elif delta is not None:
+                connection.send(delta)
+    
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, stats=True):
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(lambda: ServerConnection(self), host, port)
+        print(f"Ghost-Server auf {host}:{port}, {self.rate} Broadcasts/s")
+        interval = 1.0 / self.rate
+        next_tick = loop.time()
+        next_stats = next_tick + STATS_INTERVAL
+        bytes_in = bytes_out = 0
+        client_ticks = ticks = 0  # für die mittlere Client-Zahl im Intervall
+        async with server:
+            while True:
+                next_tick += interval
+                await asyncio.sleep(max(0.0, next_tick - loop.time()))
+                self.broadcast()
+                client_ticks += len(self.connections)
+                ticks += 1
+                if stats and loop.time() >= next_stats:
+                    # Verkehr durch die mittlere Client-Zahl teilen, ohne Clients keine Zeile pro Client
+                    clients = client_ticks / ticks
+                    if clients:
+                        rate_in = (self.bytes_in - bytes_in) / STATS_INTERVAL / clients
+                        rate_out = (self.bytes_out - bytes_out) / STATS_INTERVAL / clients
+                        print(f"{len(self.connections)} Clients (im Mittel {clients:.1f}), "
+                              f"pro Client {rate_in:.0f} B/s rein, {rate_out:.0f} B/s raus", flush=True)
+                    bytes_in, bytes_out = self.bytes_in, self.bytes_out
+                    client_ticks = ticks = 0
+                    next_stats += STATS_INTERVAL
+
+class ClientConnection(asyncio.Protocol):
+    """Client-Seite einer Verbindung: hält die Stände aller Spieler laut Server.
+    
+    listener(connection, tick, changed, keyframe) wird nach jedem Broadcast mit den
+    geänderten (ID, Stand)-Paaren aufgerufen, Stand None = gegangen.
+    """
+    def __init__(self, listener=None):
+        self.listener = listener
+        self.reader = FrameReader()
+        self.transport = None
+        self.player_id = None
+        self.rate = DEFAULT_RATE
+        self.states = {}
+        self.sent = EMPTY_STATE
+        self.bytes_in = 0
+        self.bytes_out = 0
+    
+    def connection_made(self, transport):
+        self.transport = transport
+    
+    def data_received(self, data):
+        self.bytes_in += len(data)
+        for message in self.reader.feed(data):
+            kind = message[0]
+            if kind == MSG_WELCOME:
+                self.player_id, pos = read_varint(message, 1)
+                self.rate, _ = read_varint(message, pos)
+            elif kind in (MSG_KEYFRAME, MSG_DELTA):
+                self.apply(message, kind == MSG_KEYFRAME)
+    
+    def apply(self, message, keyframe):
+        tick, pos = read_varint(message, 1)
+        count, pos = read_varint(message, pos)
+        if keyframe:
+            self.states.clear()
+        changed = []
+        for _ in range(count):
+            player_id, pos = read_varint(message, pos)
+            state, pos = decode_delta(message, pos, self.states.get(player_id, EMPTY_STATE))
+            if state is None:
+                self.states.pop(player_id, None)
+            else:
+                self.states[player_id] = state
+            changed.append((player_id, state))
+        if self.listener is not None:
+            self.listener(self, tick, changed, keyframe)
+    
+    def send_state(self, state):
+        """Eigenen Stand als Delta senden, unverändert wird nichts gesendet"""
+        if state == self.sent or self.transport is None or self.transport.is_closing():
+            return
+        body = bytearray((MSG_STATE,))
+        encode_delta(body, self.sent, state)
+        data = frame(body)
+        self.transport.write(data)
+        self.bytes_out += len(data)
+        self.sent = state
+
+class RaceClient:
+    """Ghost-Rennen aus Sicht des Spiels.
+    
+    Das Netzwerk läuft in einem eigenen Thread mit eigener asyncio-Schleife.
+    publish() und ghosts() kehren sofort zurück, die Render-Schleife wartet
+    nie auf das Netzwerk. Der eigene Stand geht mit `rate` Snapshots pro
+    Sekunde raus; Ghosts werden `delay` Broadcasts in der Vergangenheit
+    zwischen den beiden umliegenden Ständen interpoliert. Sprünge über mehr
+    als snap_distance (Umbruch am Bildschirmrand) werden nicht interpoliert.
+    """
+    def __init__(self, host, port=DEFAULT_PORT, rate=DEFAULT_RATE, snap_distance=None, delay=2):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.snap_distance = snap_distance
+        self.delay = delay
+        self.latest = None  # eigener Stand, vom Spiel-Thread gesetzt
+        self.connection = None
+        self.lock = threading.Lock()
+        self.tracks = {}  # Spieler-ID -> deque[(Serverzeit, Stand)]
+        self.clock_offset = None  # lokale Zeit minus Serverzeit
+        self.loop = asyncio.new_event_loop()
+        self.task = self.loop.create_task(self.run())
+        self.thread = threading.Thread(target=self.thread_main, name="race-client", daemon=True)
+        self.thread.start()
+    
+    @property
+    def connected(self):
+        return self.connection is not None and self.connection.player_id is not None
+    
+    def publish(self, x, y, score, facing_right, game_over=False):
+        self.latest = make_state(x, y, score, facing_right, game_over)
+    
+    def ghosts(self, now=None):
+        """Interpolierte Ghosts als (ID, x, y, score, facing_right, game_over)"""
+        now = time.perf_counter() if now is None else now
+        result = []
+        with self.lock:
+            if self.clock_offset is None or self.connection is None:
+                return result
+            when = now - self.clock_offset - self.delay / self.connection.rate
+            for player_id, track in self.tracks.items():
+                x, y, score, flags = self.sample(track, when)
+                result.append((player_id, x, y, score, bool(flags & FLAG_FACING_RIGHT), bool(flags & FLAG_GAME_OVER)))
+        return result
+    
+    def sample(self, track, when):
+        """Stand zur Serverzeit when, linear zwischen den umliegenden Snapshots"""
+        older = track[0]
+        for newer in track:
+            if newer[0] >= when:
+                break
+            older = newer
+        else:
+            return track[-1][1]  # neuester Stand, nicht extrapolieren
+        (t0, a), (t1, b) = older, newer
+        if t1 <= t0 or when <= t0:
+            return a if when <= t0 else b
+        fraction = (when - t0) / (t1 - t0)
+        x = b[0] if self.snap_distance and abs(b[0] - a[0]) > self.snap_distance else a[0] + (b[0] - a[0]) * fraction
+        return (x, a[1] + (b[1] - a[1]) * fraction, b[2], b[3])
+    
+    def received(self, connection, tick, changed, keyframe):
+        """Aus der Netzwerk-Schleife: neue Stände in die Interpolations-Puffer"""
+        interval = 1.0 / connection.rate
+        server_time = tick * interval
+        offset = time.perf_counter() - server_time
+        with self.lock:
+            # Geringste Verzögerung gilt als Uhrenabgleich, ein Keyframe setzt neu an
+            if keyframe or self.clock_offset is None or offset < self.clock_offset:
+                self.clock_offset = offset
+            if keyframe:
+                self.tracks.clear()
+            for player_id, state in changed:
+                if player_id == connection.player_id:
+                    continue
+                if state is None:
+                    self.tracks.pop(player_id, None)
+                    continue
+                track = self.tracks.get(player_id)
+                if track is None:
+                    track = self.tracks[player_id] = deque(maxlen=TRACK_LENGTH)
+                elif track[-1][0] < server_time - interval * 1.5:
+                    # Nur Änderungen werden gesendet: bis zum vorigen Broadcast stand der Ghost still
+                    track.append((server_time - interval, track[-1][1]))
+                track.append((server_time, state))
+    
+    def thread_main(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+    
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        warned = False
+        while True:
+            try:
+                transport, connection = await loop.create_connection(
+                    lambda: ClientConnection(self.received), self.host, self.port)
+            except OSError as e:
+                if not warned:
+                    print(f"Ghost-Server {self.host}:{self.port} nicht erreichbar ({e}), versuche es weiter")
+                    warned = True
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            warned = False
+            self.connection = connection
+            try:
+                while not transport.is_closing():
+                    if self.latest is not None:
+                        connection.send_state(self.latest)
+                    await asyncio.sleep(1.0 / self.rate)
+            finally:
+                transport.close()
+                with self.lock:
+                    self.tracks.clear()
+                    self.clock_offset = None
+    
+    def close(self):
+        """Verbindung trennen und Thread beenden; liefert (gesendete, empfangene) Bytes"""
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join(timeout=1.0)
+        if self.connection is None:
+            return 0, 0
+        return self.connection.bytes_out, self.connection.bytes_in
+
+async def run_bot(game, index, host, port, rate, seconds):
+    """Ein headless Spieler: GameWorld mit Kletter-Bot, grobe Schritte passend zur Rate"""
+    loop = asyncio.get_running_loop()
+    world = game.GameWorld(index)
+    transport, connection = await loop.create_connection(ClientConnection, host, port)
+    ticks = max(1, game.TICK_RATE // rate)
+    end = loop.time() + seconds
+    while loop.time() < end and not transport.is_closing():
+        world.step(game.climber_inputs(world), ticks)
+        if world.game_over:
+            world.reset(world.seed)
+        connection.send_state(make_state(world.player.x, world.player.y, world.score, world.player_facing_right))
+        await asyncio.sleep(1.0 / rate)
+    transport.close()
+    return connection
+
+async def run_bots(count, host, port, rate, seconds):
+    import DoodlePlumber as game
+    bots = [run_bot(game, index, host, port, rate, seconds) for index in range(count)]
+    connections = await asyncio.gather(*bots)
+    bytes_out = sum(c.bytes_out for c in connections) / count / seconds
+    bytes_in = sum(c.bytes_in for c in connections) / count / seconds
+    ghosts = sum(len(c.states) for c in connections) / count
+    print(f"{count} Bots, pro Bot {bytes_out:.0f} B/s gesendet, {bytes_in:.0f} B/s empfangen, "
+          f"im Schnitt {ghosts:.0f} Spieler bekannt")
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    """'HOST:PORT' oder nur 'HOST'"""
+    host, _, port = text.rpartition(":")
+    if not host:
+        return text, default_port
+    return host, int(port)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DoodlePlumber Ghost-Rennen")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Ghost-Server starten")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--rate", type=int, default=DEFAULT_RATE, help="Broadcasts pro Sekunde")
+    bots = commands.add_parser("bots", help="headless Bots als Last-Test verbinden")
+    bots.add_argument("--server", default=f"127.0.0.1:{DEFAULT_PORT}", help="HOST:PORT")
+    bots.add_argument("--count", type=int, default=100)
+    bots.add_argument("--rate", type=int, default=DEFAULT_RATE, help="Snapshots pro Sekunde und Bot")
+    bots.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    
+    try:
+        if args.command == "serve":
+            asyncio.run(RaceServer(args.rate).serve(args.host, args.port))
+        else:
+            host, port = parse_address(args.server)
+            asyncio.run(run_bots(args.count, host, port, args.rate, args.seconds))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
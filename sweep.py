@@ -0,0 +1,216 @@
+"""Seed-Sweeps und Agenten-Auswertung über alle Kerne.
+
+Jeder Worker eines Prozess-Pools bekommt einen zusammenhängenden
+Seed-Bereich und spielt dafür headless Episoden mit GameWorld. Jede
+fertige Episode geht sofort über eine Queue zurück und wird als
+JSON-Zeile angehängt - ein abgebrochener Sweep lässt sich mit demselben
+Aufruf fortsetzen, bereits gespielte Seeds werden übersprungen:
+    
+    python sweep.py --seeds 0:10000 --agent climber --output sweep.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty
+
+import DoodlePlumber as game
+
+RESULT_TIMEOUT = 1.0  # so oft wird ohne neue Ergebnisse nach abgestürzten Workern gesehen
+
+def idle_agent(seed):
+    return lambda world: 0
+
+def climber_agent(seed):
+    return game.climber_inputs
+
+def random_agent(seed):
+    """Zufällige Eingaben aus eigenem RNG, damit world.rng unberührt bleibt"""
+    rng = random.Random(seed)
+    choices = [0, game.INPUT_LEFT, game.INPUT_RIGHT]
+    return lambda world: rng.choice(choices)
+
+def lookahead_agent(seed, horizon=30):
+    """Suche eine Ebene tief: jede Eingabe `horizon` Ticks vorausspielen und zurückspulen"""
+    choices = [0, game.INPUT_LEFT, game.INPUT_RIGHT]
+    def policy(world):
+        snapshot = world.snapshot()
+        best = best_value = None
+        for inputs in choices:
+            world.step(inputs, horizon)
+            value = (not world.game_over, world.score)
+            world.restore(snapshot)
+            if best_value is None or value > best_value:
+                best, best_value = inputs, value
+        return best
+    return policy
+
+AGENTS = {
+    "idle": idle_agent,
+    "climber": climber_agent,
+    "random": random_agent,
+    "lookahead": lookahead_agent,
+}
+
+def run_episode(seed, agent="climber", max_steps=20000, ticks=1):
+    """Eine Episode spielen und ihre Kennzahlen liefern.
+    Mit ticks > 1 entscheidet der Agent nur alle `ticks` Ticks (grobe Schritte, schneller)."""
+    world = game.GameWorld(seed)
+    policy = AGENTS[agent](seed)
+    start_y = world.player.y
+    highest_y = start_y
+    
+    while world.time_counter < max_steps:
+        world.step(policy(world), min(ticks, max_steps - world.time_counter))
+        highest_y = min(highest_y, world.player.y)
+        if world.game_over:
+            break
+    
+    return {
+        "seed": seed,
+        "agent": agent,
+        "max_steps": max_steps,
+        "step_ticks": ticks,  # "ticks" ist die Länge der Episode
+        "score": round(world.score, 1),
+        "coin_count": world.coin_count,
+        "height": start_y - highest_y,
+        "ticks": world.time_counter,
+        "death_cause": "fell" if world.game_over else "timeout",
+    }
+
+# Ergebnis-Queue im Worker-Prozess, wird vom Pool-Initializer gesetzt (Queues lassen sich nur vererben)
+result_queue = None
+
+def init_worker(queue):
+    global result_queue
+    result_queue = queue
+
+def worker(seeds, agent, max_steps, ticks):
+    """Seed-Bereich abarbeiten, jedes Ergebnis einzeln zurückmelden, am Ende None"""
+    try:
+        for seed in seeds:
+            result_queue.put(run_episode(seed, agent, max_steps, ticks))
+    finally:
+        result_queue.put(None)
+
+def parse_seeds(text):
+    """'START:STOP' (STOP exklusiv) oder eine einzelne Anzahl ab 0"""
+    if ":" in text:
+        start, stop = text.split(":", 1)
+        return range(int(start), int(stop))
+    return range(int(text))
+
+def load_finished(path, agent, max_steps, ticks):
+    """Seeds, die im Ergebnis-File für diesen Agenten mit denselben Einstellungen schon stehen.
+    Zeilen mit anderem max_steps oder anderen Ticks pro Schritt zählen nicht.
+    Eine nach einem Abbruch halb geschriebene letzte Zeile wird abgeschnitten."""
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+        for line in data.splitlines():
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if (result.get("agent"), result.get("max_steps"), result.get("step_ticks")) == (agent, max_steps, ticks):
+                finished.add(result["seed"])
+    return finished
+
+def split_ranges(seeds, parts):
+    """Seeds in höchstens `parts` zusammenhängende Stücke teilen"""
+    parts = max(1, min(parts, len(seeds)))
+    size, rest = divmod(len(seeds), parts)
+    chunks = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < rest else 0)
+        chunks.append(seeds[start:end])
+        start = end
+    return chunks
+
+def sweep(seeds, agent="climber", workers=None, max_steps=20000, output=None, progress=True, ticks=1):
+    """Episoden für alle Seeds verteilt spielen.
+    
+    Ergebnisse werden sofort an output angehängt (falls angegeben). Liefert die
+    Liste der in diesem Aufruf gespielten Episoden.
+    """
+    workers = workers or os.cpu_count() or 1
+    finished = load_finished(output, agent, max_steps, ticks) if output else set()
+    pending = [seed for seed in seeds if seed not in finished]
+    if progress and finished:
+        print(f"{len(seeds) - len(pending)} Episoden schon vorhanden, {len(pending)} offen")
+    if not pending:
+        return []
+    
+    queue = multiprocessing.Queue(maxsize=1024)
+    ranges = split_ranges(pending, workers)
+    results = []
+    out = open(output, "a") if output else None
+    start = time.perf_counter()
+    try:
+        # ProcessPoolExecutor statt multiprocessing.Pool: stirbt ein Worker hart (OOM-Kill,
+        # Segfault), schlagen alle Jobs mit BrokenProcessPool fehl, statt ewig offen zu bleiben
+        with ProcessPoolExecutor(len(ranges), initializer=init_worker, initargs=(queue,)) as pool:
+            jobs = [pool.submit(worker, chunk, agent, max_steps, ticks) for chunk in ranges]
+            running = len(jobs)
+            while running:
+                try:
+                    result = queue.get(timeout=RESULT_TIMEOUT)
+                except Empty:
+                    # Ein hart abgestürzter Worker schickt kein None mehr - Fehler sofort weiterreichen
+                    for job in jobs:
+                        if job.done() and job.exception() is not None:
+                            raise job.exception()
+                    continue
+                if result is None:
+                    running -= 1
+                    continue
+                results.append(result)
+                if out:
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+                if progress and len(results) % 100 == 0:
+                    rate = len(results) / (time.perf_counter() - start)
+                    print(f"{len(results)}/{len(pending)} Episoden, {rate:.1f}/s", flush=True)
+            for job in jobs:
+                job.result()  # Fehler aus den Workern weiterreichen
+    finally:
+        if out:
+            out.close()
+    return results
+
+def summarize(results, elapsed, workers):
+    if not results:
+        return
+    scores = sorted(r["score"] for r in results)
+    causes = {}
+    for r in results:
+        causes[r["death_cause"]] = causes.get(r["death_cause"], 0) + 1
+    print(f"{len(results)} Episoden in {elapsed:.1f}s mit {workers} Workern ({len(results) / elapsed:.1f}/s)")
+    print(f"Score: Mittel {sum(scores) / len(scores):.1f}, Median {scores[len(scores) // 2]:.1f}, Max {scores[-1]:.1f}")
+    print(f"Münzen gesamt {sum(r['coin_count'] for r in results)}, "
+          f"größte Höhe {max(r['height'] for r in results)}, Ende: {causes}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DoodlePlumber Seed-Sweep über einen Prozess-Pool")
+    parser.add_argument("--seeds", default="0:1000", help="Seed-Bereich START:STOP oder Anzahl")
+    parser.add_argument("--agent", choices=sorted(AGENTS), default="climber")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Anzahl Prozesse")
+    parser.add_argument("--max-steps", type=int, default=20000, help="Abbruch pro Episode in Ticks")
+    parser.add_argument("--ticks", type=int, default=1, help="Ticks pro Agenten-Entscheidung (grobe Schritte)")
+    parser.add_argument("--output", metavar="DATEI", help="Ergebnisse als JSON-Zeilen anhängen (setzt fort)")
+    args = parser.parse_args(argv)
+    
+    start = time.perf_counter()
+    results = sweep(parse_seeds(args.seeds), args.agent, args.workers, args.max_steps, args.output, ticks=args.ticks)
+    summarize(results, time.perf_counter() - start, args.workers)
+
+if __name__ == "__main__":
+    main()
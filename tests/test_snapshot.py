@@ -0,0 +1,42 @@
+"""Snapshot-Rundreise: snapshot -> to_bytes -> from_bytes -> restore und weiterspielen"""
+import os
+import random
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import DoodlePlumber as game
+
+TICKS = 600
+
+def play(world, ticks, seed):
+    """Kletterer mit zufälligen Störungen, damit auch Sprünge zur Seite vorkommen"""
+    rng = random.Random(seed)
+    for _ in range(ticks):
+        world.step(game.climber_inputs(world) | rng.choice((0, 0, game.INPUT_LEFT, game.INPUT_RIGHT)))
+        if world.game_over:
+            break
+
+@pytest.mark.parametrize("seed", range(8))
+def test_bytes_roundtrip_continues_identically(seed):
+    world = game.GameWorld(seed)
+    play(world, 100 + seed * 15, seed)
+    # Power-Up über dem Spieler, das vor dem Snapshot schon geschwebt ist
+    world.add_power_up(game.PowerUp(world.player.centerx, world.player.y - 300))
+    world.step(0)
+    world.step(0)
+    assert any(isinstance(power_up.prev_y, float) for power_up in world.power_ups)
+    
+    data = world.snapshot().to_bytes()
+    play(world, TICKS, 1000 + seed)
+    expected = world.snapshot().to_bytes()
+    
+    restored = game.GameWorld()
+    restored.restore(game.WorldSnapshot.from_bytes(data))
+    assert restored.snapshot().to_bytes() == data
+    play(restored, TICKS, 1000 + seed)
+    assert restored.snapshot().to_bytes() == expected